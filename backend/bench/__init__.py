@@ -0,0 +1 @@
+"""Benchmarks: synthetic data (synthetic), in-process endpoint timings (micro), HTTP load (load)."""
@@ -0,0 +1,165 @@
+"""Closed-loop HTTP load driver: N workers, each sending its next request as soon as the last returns.
+
+    # against a running server
+    python -m backend.bench.load --url http://127.0.0.1:8000 --concurrency 16 --duration 30
+    # or start uvicorn on a fresh synthetic database first
+    python -m backend.bench.load --spawn --preset medium --workers 2
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from backend.bench import results
+from backend.bench.synthetic import PRESETS, Scale, generate
+
+
+def scenario(scale: Scale, seed: int = 1):
+    """Weighted read mix, (name, weight, path factory); roughly what the dashboard does."""
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(1, scale.portfolios + 1, size=4096)
+    pick = lambda i: int(ids[i % len(ids)])
+    return [
+        ("portfolio_detail", 50, lambda i: f"/portfolio/{pick(i)}"),
+        ("portfolio_list", 10, lambda i: "/api/portfolios"),
+        ("performance", 10, lambda i: f"/api/portfolio/{pick(i)}/performance"),
+        ("nav_history", 10, lambda i: f"/api/portfolio/{pick(i)}/nav"),
+        ("transactions", 10, lambda i: f"/api/transactions?portfolio_id={pick(i)}&limit=100"),
+        ("equity_master", 5, lambda i: "/api/equity-master"),
+        ("risk", 5, lambda i: f"/api/portfolio/{pick(i)}/risk"),
+    ]
+
+
+def worker(base, plan, deadline, max_requests, counter, lock, samples, errors):
+    parts = urlsplit(base)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    while time.perf_counter() < deadline:
+        with lock:
+            i = counter[0]
+            counter[0] += 1
+        if max_requests and i >= max_requests:
+            break
+        name, path = plan(i)
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 500
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            samples[name].append(elapsed)
+            if not ok:
+                errors[name] += 1
+    conn.close()
+
+
+def drive(base: str, scale: Scale, concurrency: int, duration: float, max_requests: int = 0) -> dict:
+    routes = scenario(scale)
+    # Deterministic interleaving of the weighted mix
+    slots = np.repeat(np.arange(len(routes)), [w for _, w, _ in routes])
+    order = np.random.default_rng(scale.seed).permutation(slots)
+
+    def plan(i):
+        name, _, path = routes[order[i % len(order)]]
+        return name, path(i)
+
+    samples, errors = defaultdict(list), defaultdict(int)
+    counter, lock = [0], threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [threading.Thread(target=worker, args=(base, plan, deadline, max_requests, counter, lock, samples, errors)) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    everything = [s for values in samples.values() for s in values]
+    benchmarks = {}
+    for name, values in sorted(samples.items()):
+        benchmarks[name] = {**results.latency_summary(values), "errors": errors[name], "throughput_rps": round(len(values) / elapsed, 1)}
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "throughput_rps": round(len(everything) / elapsed, 1),
+        "overall": results.latency_summary(everything),
+        "benchmarks": benchmarks,
+    }
+
+
+def spawn_server(scale: Scale, port: int, workers: int):
+    workdir = tempfile.mkdtemp(prefix="pms-load-")
+    url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    print(f"Generating {scale} into {url}")
+    generate(create_engine(url), scale)
+    env = {**os.environ, "DATABASE_URL": url, "DB_DEBUG_HEADERS": "0"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env, cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    )
+    for _ in range(300):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/portfolios")
+            conn.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0: run for --duration)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium", help="dataset size the ids are drawn from")
+    parser.add_argument("--spawn", action="store_true", help="generate a database and start uvicorn on it")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    scale = PRESETS[args.preset]
+    server = None
+    base = args.url
+    if args.spawn:
+        server = spawn_server(scale, args.port, args.workers)
+        base = f"http://127.0.0.1:{args.port}"
+    try:
+        payload = drive(base, scale, args.concurrency, args.duration, args.requests)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    overall = payload["overall"]
+    print(f"{payload['requests']} requests, {payload['throughput_rps']} req/s, {payload['errors']} errors")
+    print(f"p50 {overall.get('p50_ms')} ms  p95 {overall.get('p95_ms')} ms  p99 {overall.get('p99_ms')} ms")
+    payload.update({"preset": args.preset, "target": base, "server_workers": args.workers if args.spawn else None})
+    print(f"Saved {results.save('load', payload, args.output)}")
+    if args.compare:
+        results.compare(args.compare, payload, "p95_ms")
+
+
+if __name__ == "__main__":
+    main()
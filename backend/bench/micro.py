@@ -0,0 +1,142 @@
+"""Endpoint micro-benchmarks in-process (no network) against a synthetic SQLite database.
+
+    python -m backend.bench.micro --preset small --repeat 20 [--compare results/micro-abc123-....json]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+from typing import Callable, Dict
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from backend.bench import results
+from backend.bench.synthetic import PRESETS, Scale, equity_master_csv, generate, prices_csv, recon_files, trading_days, transactions_csv
+from backend.models import async_database_url
+
+GROUPS = ("valuation", "upload", "reconcile", "masters")
+
+
+def build_client(url: str):
+    from backend.main import app, get_async_db, get_db
+
+    engine = create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncSession = async_sessionmaker(create_async_engine(async_database_url(url), poolclass=NullPool), autoflush=False, expire_on_commit=False)
+
+    def bench_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def bench_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = bench_db
+    app.dependency_overrides[get_async_db] = bench_async_db
+    return TestClient(app), engine
+
+
+def benchmarks(client: TestClient, scale: Scale, upload_rows: int) -> Dict[str, tuple]:
+    # name -> (group, call); each call makes one request and returns the response
+    rng = np.random.default_rng(scale.seed)
+    portfolio_ids = rng.integers(1, scale.portfolios + 1, size=1000)
+    counter = iter(range(10 ** 9))
+    batch = ",".join(str(i) for i in range(1, min(scale.portfolios, 50) + 1))
+    next_day = trading_days(scale.days)[-1].astype(object) + timedelta(days=1)
+
+    trades_file = transactions_csv(scale, upload_rows)
+    price_file = prices_csv(scale, next_day)
+    master_file = equity_master_csv(upload_rows)
+    im, cust, ch = recon_files(upload_rows)
+
+    def upload(path, name, content, **params):
+        return lambda: client.post(path, params=params, files={"file": (name, content, "text/csv")})
+
+    return {
+        "portfolio_detail": ("valuation", lambda: client.get(f"/portfolio/{portfolio_ids[next(counter) % len(portfolio_ids)]}")),
+        "portfolio_list": ("valuation", lambda: client.get("/api/portfolios")),
+        "performance_batch": ("valuation", lambda: client.get("/api/performance", params={"ids": batch})),
+        "risk_all": ("valuation", lambda: client.get("/api/risk")),
+        "transactions_upload": ("upload", upload("/api/transactions/upload", "trades.csv", trades_file)),
+        "price_feed": ("upload", upload("/api/prices/bulk", "prices.csv", price_file)),
+        "equity_master_upload": ("upload", upload("/api/equity-master/upload", "equities.csv", master_file)),
+        "reconcile": ("reconcile", lambda: client.post("/reconcile", files={
+            "im_file": ("im.csv", im, "text/csv"), "cust_file": ("cust.csv", cust, "text/csv"), "ch_file": ("ch.csv", ch, "text/csv"),
+        })),
+        "equity_master_list": ("masters", lambda: client.get("/api/equity-master")),
+        "bond_master_list": ("masters", lambda: client.get("/api/bond-master")),
+    }
+
+
+def time_call(call: Callable, repeat: int, warmup: int = 1):
+    for _ in range(warmup):
+        response = call()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.status_code}: {response.text[:200]}")
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run(scale: Scale, repeat: int = 10, upload_rows: int = 1000, groups=GROUPS, workdir: str = None) -> dict:
+    workdir = workdir or tempfile.mkdtemp(prefix="pms-bench-")
+    url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    started = time.perf_counter()
+    dataset = generate(create_engine(url), scale)
+    seed_seconds = time.perf_counter() - started
+
+    client, engine = build_client(url)
+    out = {}
+    try:
+        for name, (group, call) in benchmarks(client, scale, upload_rows).items():
+            if group not in groups:
+                continue
+            stats = results.latency_summary(time_call(call, repeat))
+            stats["group"] = group
+            if group in ("upload", "reconcile"):
+                rows = scale.securities if name == "price_feed" else upload_rows
+                stats["rows_per_second"] = round(rows / (stats["p50_ms"] / 1000), 1) if stats["p50_ms"] else None
+            out[name] = stats
+            print(f"{name:<24} p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms")
+    finally:
+        from backend.main import app, get_async_db, get_db
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_async_db, None)
+        engine.dispose()
+
+    return {"dataset": {**dataset, "seed_seconds": round(seed_seconds, 2)}, "repeat": repeat, "upload_rows": upload_rows, "benchmarks": out}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--upload-rows", type=int, default=1000)
+    parser.add_argument("--only", help=f"comma separated groups: {', '.join(GROUPS)}")
+    parser.add_argument("--output", help="result file (default: bench/results/micro-<revision>-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    groups = tuple(g.strip() for g in args.only.split(",")) if args.only else GROUPS
+    payload = run(PRESETS[args.preset], args.repeat, args.upload_rows, groups)
+    payload["preset"] = args.preset
+    print(f"Saved {results.save('micro', payload, args.output)}")
+    if args.compare:
+        results.compare(args.compare, payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+RESULTS_DIR = os.getenv("BENCH_RESULTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def latency_summary(seconds) -> dict:
+    ms = np.asarray(seconds, dtype=float) * 1000
+    if len(ms) == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": int(len(ms)),
+        "min_ms": round(float(ms.min()), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def save(kind: str, payload: dict, path: Optional[str] = None) -> str:
+    revision = git_revision()
+    document = {
+        "kind": kind,
+        "revision": revision,
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        **payload,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{kind}-{revision}-{datetime.utcnow():%Y%m%d%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare(baseline_path: str, current: dict, metric: str = "p50_ms"):
+    """Print per-benchmark change in `metric` against a saved result."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = baseline.get("benchmarks", {})
+    print(f"vs {baseline.get('revision')} ({metric})")
+    for name, stats in current.get("benchmarks", {}).items():
+        old = before.get(name, {}).get(metric)
+        new = stats.get(metric)
+        if old and new is not None:
+            print(f"  {name:<32} {old:>10.2f} -> {new:>10.2f}  {100 * (new - old) / old:+.1f}%")
+        else:
+            print(f"  {name:<32} {'-':>10} -> {new}")
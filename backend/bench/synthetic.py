@@ -0,0 +1,251 @@
+"""Deterministic synthetic data for benchmarks: same seed and sizes, same database."""
+import argparse
+import hashlib
+import io
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+
+from backend.models import Asset, Base, BondMaster, EquityMaster, Holding, MarketData, Portfolio, Transaction, User
+from backend.positions import fold
+
+# Rows per INSERT so a million-row ledger doesn't sit in one statement
+CHUNK = 10000
+START_DATE = date(2023, 1, 1)
+SECTORS = ["Commercial Banks", "Hydropower", "Insurance", "Microfinance", "Manufacturing", "Hotels", "Telecom"]
+
+
+@dataclass
+class Scale:
+    users: int = 20
+    portfolios: int = 200
+    holdings: int = 10  # distinct securities per portfolio
+    transactions: int = 50  # per portfolio
+    securities: int = 300
+    days: int = 250  # business days of price history
+    seed: int = 42
+
+
+PRESETS = {
+    "small": Scale(users=5, portfolios=20, holdings=5, transactions=20, securities=50, days=60),
+    "medium": Scale(),
+    "large": Scale(users=100, portfolios=5000, holdings=20, transactions=200, securities=1000, days=500),
+}
+
+
+def trading_days(days: int) -> np.ndarray:
+    return np.busday_offset(np.datetime64(START_DATE, "D"), np.arange(days), roll="forward", weekmask="1111001")
+
+
+def security_frame(scale: Scale, rng: np.random.Generator) -> pd.DataFrame:
+    n = scale.securities
+    ids = np.arange(1, n + 1)
+    # Roughly the NEPSE mix: mostly equity, some debentures and funds
+    kind = rng.choice(["Equity", "Debt", "Mutual Fund"], size=n, p=[0.75, 0.15, 0.10])
+    base = np.where(kind == "Debt", 1000.0, np.where(kind == "Mutual Fund", 10.0, rng.uniform(200, 3000, n).round(1)))
+    return pd.DataFrame({
+        "AssetID": ids,
+        "AssetName": [f"Synthetic {k} {i}" for k, i in zip(kind, ids)],
+        "TickerSymbol": [f"SYN{i:05d}" for i in ids],
+        "ISIN": [f"NP{i:010d}" for i in ids],
+        "AssetType": kind,
+        "BasePrice": base,
+    })
+
+
+def price_paths(securities: pd.DataFrame, days: int, rng: np.random.Generator) -> np.ndarray:
+    # Geometric random walk per security, debt close to par
+    vol = np.where(securities["AssetType"].to_numpy() == "Equity", 0.02, 0.003)
+    shocks = rng.normal(0.0003, 1.0, size=(days, len(securities))) * vol
+    return (securities["BasePrice"].to_numpy() * np.exp(np.cumsum(shocks, axis=0))).round(2)
+
+
+def ledger(scale: Scale, securities: pd.DataFrame, days: np.ndarray, prices: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+    per = scale.transactions
+    pids = np.repeat(np.arange(1, scale.portfolios + 1), per)
+    held = min(scale.holdings, len(securities))
+    # Each portfolio trades its own basket of securities
+    baskets = np.argsort(rng.random((scale.portfolios, len(securities))), axis=1)[:, :held]
+    column = baskets[np.repeat(np.arange(scale.portfolios), per), rng.integers(0, held, size=len(pids))]
+    day_index = np.sort(rng.integers(0, len(days), size=(scale.portfolios, per)), axis=1).ravel()
+    quantity = rng.integers(1, 50, size=len(pids)) * 10
+    price = prices[day_index, column]
+
+    frame = pd.DataFrame({
+        "PortfolioID": pids,
+        "AssetID": securities["AssetID"].to_numpy()[column],
+        "TradeDate": days[day_index].astype(object),
+        "Quantity": quantity,
+        "Price": price,
+    })
+    # Sells only where the running position covers them, so the ledger always folds cleanly
+    frame["Type"] = np.where(rng.random(len(frame)) < 0.3, "Sell", "Buy")
+    signed = np.where(frame["Type"] == "Buy", frame["Quantity"], 0)
+    bought_before = pd.Series(signed).groupby([frame["PortfolioID"], frame["AssetID"]]).cumsum() - signed
+    sold_before = pd.Series(np.where(frame["Type"] == "Sell", frame["Quantity"], 0)).groupby([frame["PortfolioID"], frame["AssetID"]]).cumsum()
+    oversold = (frame["Type"] == "Sell") & (sold_before > bought_before)
+    frame.loc[oversold, "Type"] = "Buy"
+
+    frame["Amount"] = (frame["Quantity"] * frame["Price"]).round(2)
+    frame["BrokerFees"] = (frame["Amount"] * 0.004).round(2)
+    frame["TransID"] = [f"SYN-{i:09d}" for i in range(1, len(frame) + 1)]
+    frame["SettlementDate"] = np.busday_offset(days[day_index], 2, roll="forward", weekmask="1111001").astype(object)
+    frame["Currency"] = "NPR"
+    frame["Broker"] = "Synthetic Securities"
+    frame["TransactionDate"] = datetime(2024, 1, 1)
+    return frame
+
+
+def generate(engine: Engine, scale: Scale = Scale()) -> dict:
+    """Create the schema on `engine` and fill it; returns row counts and a content digest."""
+    rng = np.random.default_rng(scale.seed)
+    Base.metadata.create_all(bind=engine)
+
+    securities = security_frame(scale, rng)
+    days = trading_days(scale.days)
+    prices = price_paths(securities, scale.days, rng)
+    trades = ledger(scale, securities, days, prices, rng)
+
+    users = [
+        {"UserID": f"synth{i}@nimb", "PasswordHash": hashlib.sha256(f"Synth@{i}".encode()).hexdigest(), "Name": f"Synthetic User {i}",
+         "Address": "Kathmandu", "Email": f"synth{i}@nimb.com", "Phone": f"98{i:08d}", "Role": "Investment Manager"}
+        for i in range(1, scale.users + 1)
+    ]
+    portfolios = [
+        {"PortfolioID": pid, "UserID": users[(pid - 1) % len(users)]["UserID"] if users else None, "PortfolioName": f"Synthetic Portfolio {pid}",
+         "PortfolioType": "Discretionary", "ProductType": "EQ", "PortfolioLevel": "Standard", "RiskLevel": ["Low", "Moderate", "High"][pid % 3],
+         "RelationshipManager": "Synthetic RM", "BankName": "NIMB Bank", "BankAccountNo": f"{pid:010d}", "IfscCode": "NIMB001",
+         "BrokerName": "Synthetic Securities", "BrokerAccountNo": f"{pid:09d}", "NomineeName": f"Nominee {pid}", "AllocationPercentage": 100.0,
+         "Relationship": "Self", "CreatedDate": datetime(2023, 1, 1)}
+        for pid in range(1, scale.portfolios + 1)
+    ]
+    last_prices = prices[-1]
+    assets = [
+        {"AssetID": int(r.AssetID), "AssetName": r.AssetName, "TickerSymbol": r.TickerSymbol, "AssetType": r.AssetType, "CurrentPrice": float(p)}
+        for r, p in zip(securities.itertuples(), last_prices)
+    ]
+    equities = securities[securities["AssetType"] != "Debt"]
+    equity_master = [
+        {"ISIN": r.ISIN, "TickerNSE": r.TickerSymbol, "SecurityName": r.AssetName, "Country": "Nepal", "Currency": "NPR",
+         "Status": "Active", "AssetClass": r.AssetType, "Sector": SECTORS[int(r.AssetID) % len(SECTORS)], "FaceValue": 100, "LotSize": 10}
+        for r in equities.itertuples()
+    ]
+    bonds = securities[securities["AssetType"] == "Debt"]
+    bond_master = [
+        {"ISIN": r.ISIN, "Ticker": r.TickerSymbol, "BondName": r.AssetName, "FaceValue": 1000, "CouponRate": 8.5 + int(r.AssetID) % 4 * 0.5,
+         "IssueSize": 1000000000, "CreditRating": "AA", "Currency": "NPR", "MaturityDate": date(2030 + int(r.AssetID) % 5, 1, 1)}
+        for r in bonds.itertuples()
+    ]
+
+    trade_columns = ["PortfolioID", "AssetID", "TradeDate", "Type", "Quantity", "Price", "Amount", "BrokerFees"]
+    states = fold(trades[trade_columns].itertuples(index=False, name=None), {})
+    holdings = [
+        {"PortfolioID": int(pid), "AssetID": int(aid), "Quantity": int(qty), "PurchasePrice": cost / qty,
+         "PurchaseDate": datetime.combine(opened, datetime.min.time())}
+        for (pid, aid), (qty, cost, opened) in sorted(states.items()) if qty > 0
+    ]
+
+    market = pd.DataFrame({
+        "AssetID": np.tile(securities["AssetID"].to_numpy(), scale.days),
+        "PriceDate": np.repeat(days, len(securities)).astype(object),
+        "Price": prices.ravel(),
+        "Quantity": rng.integers(100, 100000, size=prices.size).astype(float),
+    })
+
+    tables = [
+        (User.__table__, users),
+        (Portfolio.__table__, portfolios),
+        (Asset.__table__, assets),
+        (EquityMaster.__table__, equity_master),
+        (BondMaster.__table__, bond_master),
+        (Holding.__table__, holdings),
+        (Transaction.__table__, trades.to_dict("records")),
+        (MarketData.__table__, market.to_dict("records")),
+    ]
+    counts = {}
+    with engine.begin() as conn:
+        for table, rows in tables:
+            for i in range(0, len(rows), CHUNK):
+                conn.execute(insert(table), rows[i:i + CHUNK])
+            counts[table.name] = len(rows)
+
+    digest = hashlib.sha256(pd.util.hash_pandas_object(trades[trade_columns], index=False).values.tobytes()).hexdigest()[:16]
+    return {"scale": asdict(scale), "rows": counts, "digest": digest}
+
+
+# Upload payloads, shaped like the files users send through the UI
+
+def transactions_csv(scale: Scale, rows: int, seed: int = 7) -> bytes:
+    rng = np.random.default_rng(seed)
+    tickers = [f"SYN{i:05d}" for i in rng.integers(1, scale.securities + 1, size=rows)]
+    df = pd.DataFrame({
+        "Portfolio ID": rng.integers(1, scale.portfolios + 1, size=rows),
+        "Trade Date": np.datetime_as_string(trading_days(scale.days)[rng.integers(0, scale.days, size=rows)]),
+        "Ticker": tickers,
+        "Transaction Type": "Buy",
+        "Quantity": rng.integers(1, 50, size=rows) * 10,
+        "Price": rng.uniform(100, 2000, size=rows).round(2),
+        "Broker Fees": 25.0,
+    })
+    return df.to_csv(index=False).encode()
+
+
+def prices_csv(scale: Scale, day: date, seed: int = 11) -> bytes:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Symbol": [f"SYN{i:05d}" for i in range(1, scale.securities + 1)],
+        "Date": day.isoformat(),
+        "Close": rng.uniform(100, 2000, size=scale.securities).round(2),
+        "Volume": rng.integers(100, 100000, size=scale.securities),
+    })
+    return df.to_csv(index=False).encode()
+
+
+def equity_master_csv(rows: int, seed: int = 13) -> bytes:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "ISIN": [f"NPUP{i:08d}" for i in range(rows)],
+        "SecurityName": [f"Upload Equity {i}" for i in range(rows)],
+        "TickerNSE": [f"UPL{i:05d}" for i in range(rows)],
+        "Country": "Nepal",
+        "Currency": "NPR",
+        "IssuerLEI": [f"LEI{n:012d}" for n in rng.integers(0, 10 ** 9, size=rows)],
+    })
+    return df.to_csv(index=False).encode()
+
+
+def recon_files(rows: int, break_rate: float = 0.02, seed: int = 17):
+    # (investment manager, custodian, clearing house) CSVs with a few missing and mismatched trades
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"T{i:07d}" for i in range(rows)])
+    amounts = rng.integers(1000, 1000000, size=rows)
+    files = []
+    for _ in range(3):
+        keep = rng.random(rows) >= break_rate / 2
+        amount = np.where(rng.random(rows) < break_rate / 2, amounts + 1, amounts)
+        buf = io.StringIO()
+        pd.DataFrame({"TradeID": ids[keep], "Amount": amount[keep]}).to_csv(buf, index=False)
+        files.append(buf.getvalue().encode())
+    return tuple(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with deterministic synthetic data")
+    parser.add_argument("url", help="SQLAlchemy URL of an empty database, e.g. sqlite:///bench.db")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    for field in ("users", "portfolios", "holdings", "transactions", "securities", "days", "seed"):
+        parser.add_argument(f"--{field}", type=int)
+    args = parser.parse_args()
+
+    scale = PRESETS[args.preset]
+    overrides = {f: getattr(args, f) for f in asdict(scale) if getattr(args, f) is not None}
+    scale = Scale(**{**asdict(scale), **overrides})
+    print(generate(create_engine(args.url), scale))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# A request is flagged when it runs more statements, spends longer in the database,
+# or repeats one statement shape more often than these
+QUERY_COUNT_WARN = int(os.getenv("DB_QUERY_COUNT_WARN", "50"))
+QUERY_TIME_WARN_MS = float(os.getenv("DB_QUERY_TIME_WARN_MS", "500"))
+REPEAT_WARN = int(os.getenv("DB_REPEAT_WARN", "10"))
+DEBUG_HEADERS = os.getenv("DB_DEBUG_HEADERS", "1") == "1"
+
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"\((\s*(\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "fingerprints")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+    def most_repeated(self):
+        # (fingerprint, times) of the statement run most often, or (None, 0)
+        return self.fingerprints.most_common(1)[0] if self.fingerprints else (None, 0)
+
+    def problems(self):
+        found = []
+        if self.count > QUERY_COUNT_WARN:
+            found.append(f"{self.count} queries")
+        if self.milliseconds > QUERY_TIME_WARN_MS:
+            found.append(f"{self.milliseconds:.0f} ms in database")
+        statement, times = self.most_repeated()
+        if times > REPEAT_WARN:
+            found.append(f"possible N+1, {times}x: {statement[:200]}")
+        return found
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+
+def fingerprint(statement: str) -> str:
+    # Same query shape regardless of literal values or IN-list length
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PARAMS.sub("(?)", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_started"):
+        return
+    stats.seconds += time.perf_counter() - conn.info["query_started"].pop()
+    stats.count += 1
+    stats.fingerprints[fingerprint(statement)] += 1
+
+
+@contextmanager
+def track_queries():
+    """Count statements run in this context (and threads it hands work to)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+async def query_metrics_middleware(request, call_next):
+    with track_queries() as stats:
+        response = await call_next(request)
+
+    problems = stats.problems()
+    if problems:
+        print(f"DB warning {request.method} {request.url.path}: {'; '.join(problems)}")
+    if DEBUG_HEADERS:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-ms"] = f"{stats.milliseconds:.1f}"
+        response.headers["X-DB-Max-Repeat"] = str(stats.most_repeated()[1])
+    return response
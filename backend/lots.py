@@ -0,0 +1,182 @@
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from backend.models import Transaction, RealizedGain
+
+METHODS = ("FIFO", "AVERAGE")
+DEFAULT_METHOD = os.getenv("LOT_METHOD", "FIFO").upper()
+
+# Nepal CGT on listed securities for individuals: held over a year 5%, otherwise 7.5%
+LONG_TERM_DAYS = 365
+SHORT_TERM_RATE = float(os.getenv("CGT_SHORT_TERM_RATE", "0.075"))
+LONG_TERM_RATE = float(os.getenv("CGT_LONG_TERM_RATE", "0.05"))
+
+
+class LotBook:
+    """Open lots for one position as parallel arrays, consumed from `head` (oldest first)."""
+
+    __slots__ = ("qty", "cost", "day", "head", "tail")
+
+    def __init__(self, capacity: int = 8):
+        self.qty = np.zeros(capacity)
+        self.cost = np.zeros(capacity)  # per unit, fees included
+        self.day = np.zeros(capacity, dtype="datetime64[D]")
+        self.head = 0
+        self.tail = 0
+
+    def add(self, quantity: float, unit_cost: float, day):
+        if self.tail == len(self.qty):
+            self._grow()
+        self.qty[self.tail] = quantity
+        self.cost[self.tail] = unit_cost
+        self.day[self.tail] = day
+        self.tail += 1
+
+    def _grow(self):
+        # Compact consumed lots away before doubling
+        live = slice(self.head, self.tail)
+        size = max(8, 2 * (self.tail - self.head))
+        for name in ("qty", "cost", "day"):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:self.tail - self.head] = old[live]
+            setattr(self, name, new)
+        self.tail -= self.head
+        self.head = 0
+
+    @property
+    def open_quantity(self) -> float:
+        return float(self.qty[self.head:self.tail].sum())
+
+    def consume(self, quantity: float):
+        """Take `quantity` from the oldest lots; returns (quantities, unit costs, days) taken."""
+        qty = self.qty[self.head:self.tail]
+        filled = np.cumsum(qty)
+        # Lots fully consumed, then at most one partially consumed lot
+        n = int(np.searchsorted(filled, quantity, side="left"))
+        n = min(n, len(qty) - 1)
+        taken = qty[:n + 1].copy()
+        taken[-1] = quantity - (filled[n - 1] if n > 0 else 0.0)
+        taken = np.minimum(taken, qty[:n + 1])
+        result = (taken, self.cost[self.head:self.head + n + 1].copy(), self.day[self.head:self.head + n + 1].copy())
+
+        qty[:n + 1] -= taken
+        # Advance past empty lots
+        empty = int(np.searchsorted(np.cumsum(qty[:n + 1]) > 0, True))
+        self.head += empty
+        return result
+
+    def average_cost(self) -> float:
+        qty = self.qty[self.head:self.tail]
+        total = qty.sum()
+        return float((qty * self.cost[self.head:self.tail]).sum() / total) if total > 0 else 0.0
+
+    def open_lots(self):
+        live = slice(self.head, self.tail)
+        return [(float(q), float(c), str(d)) for q, c, d in zip(self.qty[live], self.cost[live], self.day[live]) if q > 0]
+
+
+def replay(trades, method: str = DEFAULT_METHOD):
+    """Process trades (already in TradeDate, TransactionID order) and match every sell.
+
+    trades: (TransactionID, PortfolioID, AssetID, TradeDate, Type, Quantity, Price, Amount, BrokerFees)
+    Returns (books keyed by (PortfolioID, AssetID), list of realized gain rows).
+    """
+    method = method.upper()
+    if method not in METHODS:
+        raise ValueError(f"Unknown lot method: {method}")
+
+    books: Dict[tuple, LotBook] = {}
+    sales = []
+    for tid, pid, aid, trade_date, side, qty, price, amount, fees in trades:
+        if not qty:
+            continue
+        gross = abs(amount) if amount is not None else qty * (price or 0.0)
+        fees = fees or 0.0
+        book = books.get((pid, aid))
+        if book is None:
+            book = books[(pid, aid)] = LotBook()
+        day = np.datetime64(trade_date, "D")
+
+        if side == "Buy":
+            book.add(qty, (gross + fees) / qty, day)
+            continue
+
+        # Sells beyond the open quantity (short or missing history) have no cost basis to match
+        matched_qty = min(qty, book.open_quantity)
+        proceeds = gross - fees
+        if matched_qty <= 0:
+            sales.append(sale_row(tid, pid, aid, trade_date, qty, proceeds, 0.0, proceeds, 0.0, method))
+            continue
+
+        avg = book.average_cost() if method == "AVERAGE" else None
+        taken, costs, days = book.consume(matched_qty)
+        if avg is not None:
+            costs = np.full(len(taken), avg)
+        held = (day - days).astype(np.int64)
+        lot_proceeds = proceeds * taken / qty
+        lot_gain = lot_proceeds - taken * costs
+        long_term = held > LONG_TERM_DAYS
+        cost_basis = float((taken * costs).sum())
+        # Unmatched remainder of an oversell counts as short-term gain with zero basis
+        unmatched = proceeds * (qty - matched_qty) / qty
+        sales.append(sale_row(
+            tid, pid, aid, trade_date, qty, proceeds, cost_basis,
+            float(lot_gain[~long_term].sum()) + unmatched, float(lot_gain[long_term].sum()), method
+        ))
+    return books, sales
+
+
+def sale_row(tid, pid, aid, trade_date, qty, proceeds, cost_basis, short_term, long_term, method):
+    return {
+        "PortfolioID": pid,
+        "AssetID": aid,
+        "TransactionID": tid,
+        "SellDate": trade_date,
+        "Quantity": int(qty),
+        "Proceeds": round(proceeds, 4),
+        "CostBasis": round(cost_basis, 4),
+        "Gain": round(short_term + long_term, 4),
+        "ShortTermGain": round(short_term, 4),
+        "LongTermGain": round(long_term, 4),
+        "Method": method,
+    }
+
+
+def ledger(db: Session, portfolio_ids: List[int]):
+    return db.execute(
+        select(
+            Transaction.TransactionID, Transaction.PortfolioID, Transaction.AssetID, Transaction.TradeDate, Transaction.Type,
+            Transaction.Quantity, Transaction.Price, Transaction.Amount, Transaction.BrokerFees
+        )
+        .where(Transaction.PortfolioID.in_(portfolio_ids), Transaction.AssetID.isnot(None), Transaction.Type.in_(["Buy", "Sell"]))
+        .order_by(Transaction.TradeDate, Transaction.TransactionID)
+    ).all()
+
+
+def replay_portfolios(db: Session, portfolio_ids: List[int], method: Optional[str] = None) -> int:
+    # Bulk mode: rebuild realized gains for whole portfolios from their full history
+    method = (method or DEFAULT_METHOD).upper()
+    _, sales = replay(ledger(db, portfolio_ids), method)
+    db.execute(delete(RealizedGain).where(RealizedGain.PortfolioID.in_(portfolio_ids)))
+    if sales:
+        db.execute(insert(RealizedGain.__table__), sales)
+    return len(sales)
+
+
+def open_lots(db: Session, portfolio_id: int, method: Optional[str] = None) -> List[dict]:
+    books, _ = replay(ledger(db, [portfolio_id]), method or DEFAULT_METHOD)
+    return [
+        {"AssetID": aid, "Quantity": q, "UnitCost": round(c, 4), "AcquiredDate": d}
+        for (pid, aid), book in sorted(books.items())
+        for q, c, d in book.open_lots()
+    ]
+
+
+def tax_estimate(short_term_gain: float, long_term_gain: float) -> float:
+    # Losses are not taxed; this does not net losses across years
+    return round(max(short_term_gain, 0.0) * SHORT_TERM_RATE + max(long_term_gain, 0.0) * LONG_TERM_RATE, 2)
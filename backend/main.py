@@ -1,6 +1,8 @@
 from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.models import SessionLocal, Portfolio, Holding, Asset, init_db
 from pydantic import BaseModel
 from typing import List, Optional
@@ -9,7 +11,9 @@ import io
 import pandas as pd
 import re
 import hashlib
-from backend.models import SessionLocal, Portfolio, Holding, Asset, User, EquityMaster, BondMaster, init_db
+import time
+from backend.metrics import POOL_CHECKOUT, POOL_PENDING, record_upload
+from backend.models import SessionLocal, Portfolio, Holding, Asset, User, EquityMaster, BondMaster, init_db, get_async_sessionmaker
 
 app = FastAPI()
 
@@ -29,10 +33,22 @@ init_db()
 def get_db():
     db = SessionLocal()
     try:
+        # Check the connection out up front so pool waits are measured, not hidden in the first query
+        started = time.perf_counter()
+        db.connection()
+        POOL_CHECKOUT.observe(time.perf_counter() - started)
         yield db
     finally:
         db.close()
 
+# Async handlers wait on the database in the event loop instead of holding a threadpool thread
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        started = time.perf_counter()
+        await db.connection()
+        POOL_CHECKOUT.observe(time.perf_counter() - started)
+        yield db
+
 # Models for API Responses
 class AssetModel(BaseModel):
     AssetName: str
@@ -131,8 +147,8 @@ class LoginResponse(BaseModel):
     userId: str
 
 @app.get("/portfolio/{portfolio_id}", response_model=PortfolioResponse)
-def get_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
-    portfolio = db.query(Portfolio).filter(Portfolio.PortfolioID == portfolio_id).first()
+async def get_portfolio(portfolio_id: int, db: AsyncSession = Depends(get_async_db)):
+    portfolio = (await db.execute(select(Portfolio).where(Portfolio.PortfolioID == portfolio_id))).scalars().first()
     
     if not portfolio:
         # For demo purposes, if ID 1 doesn't exist, create a dummy one
@@ -156,15 +172,15 @@ def get_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
                 Relationship="Spouse"
             )
             db.add(dummy)
-            db.commit()
-            db.refresh(dummy)
+            await db.commit()
+            await db.refresh(dummy)
             portfolio = dummy
         else:
             raise HTTPException(status_code=404, detail="Portfolio not found")
 
     # Ensure holdings exist for ID 1
     if portfolio_id == 1:
-        holdings_count = db.query(Holding).filter(Holding.PortfolioID == 1).count()
+        holdings_count = (await db.execute(select(func.count()).select_from(Holding).where(Holding.PortfolioID == 1))).scalar()
         
         if holdings_count == 0:
             assets = [
@@ -173,18 +189,18 @@ def get_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
                 Asset(AssetName="NIBL Sahabhagita Fund", TickerSymbol="NIBLSF", AssetType="Mutual Fund", CurrentPrice=15)
             ]
             for a in assets:
-                existing = db.query(Asset).filter(Asset.TickerSymbol == a.TickerSymbol).first()
+                existing = (await db.execute(select(Asset).where(Asset.TickerSymbol == a.TickerSymbol))).scalars().first()
                 if not existing:
                     db.add(a)
-                    db.commit()
-                    db.refresh(a)
+                    await db.commit()
+                    await db.refresh(a)
                 else:
                     a = existing
                 
                 # Add Holding
                 h = Holding(PortfolioID=1, AssetID=a.AssetID, Quantity=100 if a.AssetType != "Mutual Fund" else 5000, PurchasePrice=a.CurrentPrice * 0.9)
                 db.add(h)
-            db.commit()
+            await db.commit()
 
     holdings_data = []
     equity_val = 0.0
@@ -192,8 +208,10 @@ def get_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
     mf_val = 0.0
     total_val = 0.0
 
-    # Explicitly query holdings
-    holdings = db.query(Holding).filter(Holding.PortfolioID == portfolio.PortfolioID).all()
+    # Explicitly query holdings, with their assets in the same round trip
+    holdings = (await db.execute(
+        select(Holding).options(joinedload(Holding.asset)).where(Holding.PortfolioID == portfolio.PortfolioID)
+    )).scalars().all()
 
     # Calculate current market value
     for holding in holdings:
@@ -256,8 +274,8 @@ def get_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/portfolios")
-def get_all_portfolios(db: Session = Depends(get_db)):
-    portfolios = db.query(Portfolio).all()
+async def get_all_portfolios(db: AsyncSession = Depends(get_async_db)):
+    portfolios = (await db.execute(select(Portfolio))).scalars().all()
     results = []
     for p in portfolios:
         results.append({
@@ -308,12 +326,13 @@ def create_portfolio(data: ClientCreationRequest, db: Session = Depends(get_db))
     return {"message": "Portfolio created successfully", "id": new_portfolio.PortfolioID}
 
 @app.post("/api/portfolio/upload")
-async def upload_portfolio(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def upload_portfolio(file: UploadFile = File(...), db: Session = Depends(get_db)):
     if not file.filename.endswith(('.csv', '.xlsx')):
         raise HTTPException(status_code=400, detail="Invalid file type. Only CSV and XLSX allowed.")
     
+    started = time.perf_counter()
     try:
-        contents = await file.read()
+        contents = file.file.read()
         if file.filename.endswith('.csv'):
             df = pd.read_csv(io.BytesIO(contents))
         else:
@@ -491,6 +510,7 @@ async def upload_portfolio(file: UploadFile = File(...), db: Session = Depends(g
         db.refresh(new_portfolio)
         created_ids.append(new_portfolio.PortfolioID)
 
+    record_upload("portfolios", len(df), started)
     return {"message": "File uploaded and processed successfully", "created_ids": created_ids}
 
 @app.delete("/api/portfolio/{portfolio_id}")
@@ -506,9 +526,9 @@ def delete_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
     return {"message": "Portfolio deleted successfully"}
 
 @app.post("/rebalance/{portfolio_id}", response_model=List[RebalanceProposal])
-def check_rebalance(portfolio_id: int, db: Session = Depends(get_db)):
+async def check_rebalance(portfolio_id: int, db: AsyncSession = Depends(get_async_db)):
     # Logic: If Equity > 50%, Sell Equity, Buy Debt
-    portfolio_data = get_portfolio(portfolio_id, db)
+    portfolio_data = await get_portfolio(portfolio_id, db)
     
     proposals = []
     target_equity_pct = 50.0
@@ -534,7 +554,7 @@ def check_rebalance(portfolio_id: int, db: Session = Depends(get_db)):
     return proposals
 
 @app.post("/reconcile", response_model=ReconSummary)
-async def reconcile_files(
+def reconcile_files(
     im_file: UploadFile = File(...),
     cust_file: UploadFile = File(...),
     ch_file: UploadFile = File(...)
@@ -544,9 +564,9 @@ async def reconcile_files(
         reader = csv.DictReader(io.StringIO(file_content.decode('utf-8')))
         return {row['TradeID']: row for row in reader}
 
-    im_data = parse_csv(await im_file.read())
-    cust_data = parse_csv(await cust_file.read())
-    ch_data = parse_csv(await ch_file.read())
+    im_data = parse_csv(im_file.file.read())
+    cust_data = parse_csv(cust_file.file.read())
+    ch_data = parse_csv(ch_file.file.read())
 
     all_ids = set(im_data.keys()) | set(cust_data.keys()) | set(ch_data.keys())
     
@@ -658,9 +678,11 @@ async def shutdown_event():
 async def get_news(symbol: Optional[str] = None):
     loop = asyncio.get_running_loop()
     # Run in a separate process to avoid Windows Event Loop issues with Playwright
-    return await loop.run_in_executor(_process_executor, scrape_news_sync, symbol)
-
-    return await loop.run_in_executor(_process_executor, scrape_news_sync, symbol)
+    POOL_PENDING.labels("news").inc()
+    try:
+        return await loop.run_in_executor(_process_executor, scrape_news_sync, symbol)
+    finally:
+        POOL_PENDING.labels("news").dec()
 
 @app.post("/api/login", response_model=LoginResponse)
 def login(creds: LoginSchema, db: Session = Depends(get_db)):
@@ -724,8 +746,8 @@ def create_user(user_data: UserCreateSchema, db: Session = Depends(get_db)):
     return {"message": "User created successfully"}
 
 @app.get("/api/users")
-def get_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
+async def get_users(db: AsyncSession = Depends(get_async_db)):
+    users = (await db.execute(select(User))).scalars().all()
     result = []
     for u in users:
         result.append({
@@ -867,16 +889,17 @@ def create_equity(data: EquityMasterSchema, db: Session = Depends(get_db)):
     return {"message": "Equity created successfully"}
 
 @app.get("/api/equity-master")
-def get_equities(db: Session = Depends(get_db)):
-    return db.query(EquityMaster).all()
+async def get_equities(db: AsyncSession = Depends(get_async_db)):
+    return (await db.execute(select(EquityMaster))).scalars().all()
 
 @app.post("/api/equity-master/upload")
-async def upload_equity_master(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def upload_equity_master(file: UploadFile = File(...), db: Session = Depends(get_db)):
     if not file.filename.endswith(('.csv', '.xlsx')):
         raise HTTPException(status_code=400, detail="Invalid file type")
     
+    started = time.perf_counter()
     try:
-        contents = await file.read()
+        contents = file.file.read()
         if file.filename.endswith('.csv'):
             df = pd.read_csv(io.BytesIO(contents))
         else:
@@ -922,6 +945,7 @@ async def upload_equity_master(file: UploadFile = File(...), db: Session = Depen
             errors.append(f"Row {index}: {str(e)}")
     
     db.commit()
+    record_upload("equity_master", len(df), started)
     return {"message": f"Processed {success_count} records", "errors": errors}
 
 @app.post("/api/bond-master")
@@ -977,16 +1001,17 @@ def create_bond(data: BondMasterSchema, db: Session = Depends(get_db)):
     return {"message": "Bond created successfully"}
 
 @app.get("/api/bond-master")
-def get_bonds(db: Session = Depends(get_db)):
-    return db.query(BondMaster).all()
+async def get_bonds(db: AsyncSession = Depends(get_async_db)):
+    return (await db.execute(select(BondMaster))).scalars().all()
 
 @app.post("/api/bond-master/upload")
-async def upload_bond_master(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def upload_bond_master(file: UploadFile = File(...), db: Session = Depends(get_db)):
     if not file.filename.endswith(('.csv', '.xlsx')):
         raise HTTPException(status_code=400, detail="Invalid file type")
     
+    started = time.perf_counter()
     try:
-        contents = await file.read()
+        contents = file.file.read()
         if file.filename.endswith('.csv'):
             df = pd.read_csv(io.BytesIO(contents))
         else:
@@ -1022,4 +1047,347 @@ async def upload_bond_master(file: UploadFile = File(...), db: Session = Depends
             errors.append(f"Row {index}: {str(e)}")
     
     db.commit()
+    record_upload("bond_master", len(df), started)
     return {"message": f"Processed {success_count} records", "errors": errors}
+
+# --- Market Data ---
+
+from backend.market_data import read_price_file, load_price_history, price_matrix, apply_price_feed, ingest_price_drop
+import numpy as np
+from datetime import date
+from fastapi.responses import JSONResponse
+
+def parse_id_list(ids: Optional[str]) -> List[int]:
+    if not ids:
+        return []
+    try:
+        return [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma separated list of integers")
+
+@app.post("/api/market-data/upload")
+def upload_market_data(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    if not file.filename.endswith(('.csv', '.xlsx')):
+        raise HTTPException(status_code=400, detail="Invalid file type. Only CSV and XLSX allowed.")
+
+    started = time.perf_counter()
+    try:
+        contents = file.file.read()
+        df = read_price_file(contents, file.filename)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+
+    try:
+        result = load_price_history(db, df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    record_upload("price_history", len(df), started)
+    return {"message": f"Loaded {result['rows_loaded']} price rows", **result}
+
+@app.get("/api/market-data/prices")
+def get_price_matrix(
+    ids: Optional[str] = None,
+    tickers: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fill: bool = True,
+    db: Session = Depends(get_db)
+):
+    asset_ids = parse_id_list(ids)
+    if tickers:
+        symbols = [t.strip().upper() for t in tickers.split(",") if t.strip()]
+        asset_ids += [a for (a,) in db.query(Asset.AssetID).filter(Asset.TickerSymbol.in_(symbols)).all()]
+    if not asset_ids:
+        raise HTTPException(status_code=400, detail="Provide ids or tickers")
+
+    dates, columns, matrix = price_matrix(db, asset_ids, start, end, fill)
+    ticker_map = dict(db.query(Asset.AssetID, Asset.TickerSymbol).filter(Asset.AssetID.in_(columns.tolist())).all())
+
+    # Columnar: one price array per asset, aligned with "dates"; gaps are null
+    prices = matrix.T.astype(object)
+    prices[np.isnan(matrix.T)] = None
+    return JSONResponse({
+        "dates": np.datetime_as_string(dates).tolist(),
+        "assetIds": columns.tolist(),
+        "tickers": [ticker_map.get(a) for a in columns.tolist()],
+        "prices": prices.tolist()
+    })
+
+# --- End-of-day Price Feed ---
+
+import os
+
+PRICE_DROP_DIR = os.getenv("PRICE_DROP_DIR")
+PRICE_DROP_INTERVAL = int(os.getenv("PRICE_DROP_INTERVAL", "60"))
+
+@app.post("/api/prices/bulk")
+def upload_price_feed(file: UploadFile = File(...), price_date: Optional[date] = None, db: Session = Depends(get_db)):
+    if not file.filename.endswith(('.csv', '.xlsx')):
+        raise HTTPException(status_code=400, detail="Invalid file type. Only CSV and XLSX allowed.")
+
+    started = time.perf_counter()
+    try:
+        contents = file.file.read()
+        df = read_price_file(contents, file.filename)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+
+    try:
+        result = apply_price_feed(db, df, price_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    record_upload("price_feed", len(df), started)
+    return {"message": f"Updated {result['updated']} asset prices", **result}
+
+async def poll_price_drop():
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            for result in await loop.run_in_executor(None, ingest_price_drop, PRICE_DROP_DIR):
+                print(f"Price drop: {result}")
+        except Exception as e:
+            print(f"Price drop failed: {e}")
+        await asyncio.sleep(PRICE_DROP_INTERVAL)
+
+@app.on_event("startup")
+async def start_price_drop():
+    if PRICE_DROP_DIR:
+        os.makedirs(PRICE_DROP_DIR, exist_ok=True)
+        asyncio.create_task(poll_price_drop())
+
+# --- Performance Analytics ---
+
+from backend.performance import compute_performance
+
+@app.get("/api/performance")
+def get_performance(ids: str, as_of: Optional[date] = None, db: Session = Depends(get_db)):
+    portfolio_ids = parse_id_list(ids)
+    if not portfolio_ids:
+        raise HTTPException(status_code=400, detail="Provide portfolio ids")
+    results = compute_performance(db, portfolio_ids, as_of)
+    return [results[pid] for pid in sorted(set(portfolio_ids)) if pid in results]
+
+@app.get("/api/portfolio/{portfolio_id}/performance")
+def get_portfolio_performance(portfolio_id: int, as_of: Optional[date] = None, db: Session = Depends(get_db)):
+    if not db.query(Portfolio).filter(Portfolio.PortfolioID == portfolio_id).first():
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    results = compute_performance(db, [portfolio_id], as_of)
+    if portfolio_id not in results:
+        raise HTTPException(status_code=404, detail="No transaction history for portfolio")
+    return results[portfolio_id]
+
+# --- Risk ---
+
+from backend.risk import compute_risk
+
+@app.get("/api/risk")
+def get_risk(ids: Optional[str] = None, as_of: Optional[date] = None, confidence: float = 0.95, lookback: int = 250, db: Session = Depends(get_db)):
+    if not 0.5 < confidence < 1:
+        raise HTTPException(status_code=400, detail="confidence must be between 0.5 and 1")
+    # No ids: firm-wide run over every portfolio
+    portfolio_ids = parse_id_list(ids) or None
+    results = compute_risk(db, portfolio_ids, as_of, confidence, lookback)
+    return [results[pid] for pid in sorted(results)]
+
+@app.get("/api/portfolio/{portfolio_id}/risk")
+def get_portfolio_risk(portfolio_id: int, as_of: Optional[date] = None, confidence: float = 0.95, lookback: int = 250, db: Session = Depends(get_db)):
+    results = compute_risk(db, [portfolio_id], as_of, confidence, lookback)
+    if portfolio_id not in results:
+        raise HTTPException(status_code=404, detail="No holdings or price history for portfolio")
+    return results[portfolio_id]
+
+# --- NAV Snapshots ---
+
+from backend.snapshots import run_snapshots
+from backend.models import NavSnapshot
+
+@app.post("/api/snapshots/run")
+def run_nav_snapshots(as_of: Optional[date] = None, db: Session = Depends(get_db)):
+    return run_snapshots(db, as_of)
+
+@app.get("/api/portfolio/{portfolio_id}/nav")
+async def get_nav_history(portfolio_id: int, start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_async_db)):
+    query = select(NavSnapshot).where(NavSnapshot.PortfolioID == portfolio_id)
+    if start:
+        query = query.where(NavSnapshot.SnapshotDate >= start)
+    if end:
+        query = query.where(NavSnapshot.SnapshotDate <= end)
+    snapshots = (await db.execute(query.order_by(NavSnapshot.SnapshotDate))).scalars().all()
+    return [
+        {
+            "Date": s.SnapshotDate.isoformat(),
+            "NAV": s.NAV,
+            "EquityValue": s.EquityValue,
+            "DebtValue": s.DebtValue,
+            "MutualFundValue": s.MutualFundValue,
+            "OtherValue": s.OtherValue,
+            "NetFlow": s.NetFlow
+        }
+        for s in snapshots
+    ]
+
+# --- Transactions ---
+
+from backend.transactions import read_transaction_file, prepare_transactions, insert_transactions, transactions_query
+from backend.positions import apply_trades, rebuild_positions
+from backend.lots import replay_portfolios, open_lots, tax_estimate, METHODS
+from backend.models import RealizedGain
+from backend.valuation import bump_epoch
+
+class TransactionSchema(BaseModel):
+    PortfolioID: int
+    TradeDate: str
+    Type: str
+    Quantity: int
+    Price: float
+    TransID: Optional[str] = None
+    SettlementDate: Optional[str] = None
+    SecurityName: Optional[str] = None
+    ISIN: Optional[str] = None
+    TickerSymbol: Optional[str] = None
+    Exchange: Optional[str] = None
+    Amount: Optional[float] = None
+    Currency: Optional[str] = None
+    Broker: Optional[str] = None
+    BrokerFees: Optional[float] = None
+
+def ingest_transactions(db: Session, df: pd.DataFrame, portfolio_id: Optional[int] = None):
+    started = time.perf_counter()
+    frame, errors, unknown = prepare_transactions(db, df, portfolio_id)
+    if errors:
+        raise HTTPException(status_code=400, detail=f"Validation Errors: {'; '.join(errors)}")
+    inserted = insert_transactions(db, frame)
+    # Holdings move in the same transaction as the trades that change them
+    touched = apply_trades(db, frame)
+    if touched:
+        replay_portfolios(db, touched)
+    db.commit()
+    if touched:
+        bump_epoch("holdings", touched)
+    record_upload("transactions", inserted, started)
+    return {"message": f"Inserted {inserted} transactions", "inserted": inserted, "unknown_securities": unknown}
+
+@app.post("/api/transactions")
+def create_transaction(data: TransactionSchema, db: Session = Depends(get_db)):
+    return ingest_transactions(db, pd.DataFrame([data.model_dump()]))
+
+@app.post("/api/transactions/bulk")
+def create_transactions_bulk(data: List[TransactionSchema], db: Session = Depends(get_db)):
+    if not data:
+        raise HTTPException(status_code=400, detail="No transactions provided")
+    return ingest_transactions(db, pd.DataFrame([t.model_dump() for t in data]))
+
+@app.post("/api/transactions/upload")
+def upload_transactions(file: UploadFile = File(...), portfolio_id: Optional[int] = None, db: Session = Depends(get_db)):
+    if not file.filename.endswith(('.csv', '.xlsx')):
+        raise HTTPException(status_code=400, detail="Invalid file type. Only CSV and XLSX allowed.")
+
+    try:
+        contents = file.file.read()
+        df = read_transaction_file(contents, file.filename)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+
+    if df.empty:
+        raise HTTPException(status_code=400, detail="File is empty.")
+    return ingest_transactions(db, df, portfolio_id)
+
+@app.get("/api/transactions")
+async def get_transactions(
+    portfolio_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = 500,
+    offset: int = 0,
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = transactions_query(portfolio_id, start, end, min(limit, 5000), offset)
+    return [dict(row) for row in (await db.execute(stmt)).mappings()]
+
+@app.post("/api/positions/rebuild")
+def rebuild_holdings(ids: Optional[str] = None, dry_run: bool = False, db: Session = Depends(get_db)):
+    # Audit: replay the ledger. dry_run only reports where stored holdings differ
+    result = rebuild_positions(db, parse_id_list(ids) or None, dry_run)
+    if not dry_run and result["portfolios"]:
+        bump_epoch("holdings")
+    return result
+
+# --- Tax Lots & Realized Gains ---
+
+@app.post("/api/lots/replay")
+def replay_lots(ids: str, method: str = "FIFO", db: Session = Depends(get_db)):
+    if method.upper() not in METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(METHODS)}")
+    portfolio_ids = parse_id_list(ids)
+    if not portfolio_ids:
+        raise HTTPException(status_code=400, detail="Provide portfolio ids")
+    sales = replay_portfolios(db, portfolio_ids, method)
+    db.commit()
+    return {"message": f"Replayed {len(portfolio_ids)} portfolios", "sales": sales}
+
+@app.get("/api/portfolio/{portfolio_id}/lots")
+def get_open_lots(portfolio_id: int, method: str = "FIFO", db: Session = Depends(get_db)):
+    if method.upper() not in METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(METHODS)}")
+    return open_lots(db, portfolio_id, method)
+
+@app.get("/api/portfolio/{portfolio_id}/realized-gains")
+async def get_realized_gains(portfolio_id: int, start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_async_db)):
+    query = select(RealizedGain).where(RealizedGain.PortfolioID == portfolio_id)
+    if start:
+        query = query.where(RealizedGain.SellDate >= start)
+    if end:
+        query = query.where(RealizedGain.SellDate <= end)
+    sales = (await db.execute(query.order_by(RealizedGain.SellDate, RealizedGain.TransactionID))).scalars().all()
+
+    short_term = sum(s.ShortTermGain or 0.0 for s in sales)
+    long_term = sum(s.LongTermGain or 0.0 for s in sales)
+    return {
+        "PortfolioID": portfolio_id,
+        "Sales": [
+            {
+                "TransactionID": s.TransactionID,
+                "AssetID": s.AssetID,
+                "SellDate": s.SellDate.isoformat(),
+                "Quantity": s.Quantity,
+                "Proceeds": s.Proceeds,
+                "CostBasis": s.CostBasis,
+                "Gain": s.Gain,
+                "ShortTermGain": s.ShortTermGain,
+                "LongTermGain": s.LongTermGain,
+                "Method": s.Method
+            }
+            for s in sales
+        ],
+        "TotalGain": round(short_term + long_term, 2),
+        "ShortTermGain": round(short_term, 2),
+        "LongTermGain": round(long_term, 2),
+        "EstimatedCGT": tax_estimate(short_term, long_term)
+    }
+
+# --- DB Query Metrics ---
+
+from backend.db_metrics import query_metrics_middleware
+
+# Per-request statement count, database time and repeated-statement detection
+app.middleware("http")(query_metrics_middleware)
+
+# --- Metrics ---
+
+from fastapi.responses import Response
+from backend.metrics import MetricsMiddleware, POOL_CHECKED_OUT, CONTENT_TYPE, collector, render
+from backend.models import engine
+
+app.add_middleware(MetricsMiddleware)
+
+@collector
+def collect_pool_usage():
+    checkedout = getattr(engine.pool, "checkedout", None)
+    if checkedout:
+        POOL_CHECKED_OUT.set(checkedout())
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(render(), media_type=CONTENT_TYPE)
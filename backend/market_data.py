@@ -0,0 +1,355 @@
+import io
+import os
+import sys
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from backend.models import Asset, BondMaster, EquityMaster, MarketData
+from backend.valuation import bump_epoch
+
+# Accepted header spellings for price files (NEPSE exports, vendor feeds, our own template)
+COLUMN_ALIASES = {
+    "TickerSymbol": ["TickerSymbol", "Ticker", "Symbol", "Scrip", "Stock Symbol"],
+    "ISIN": ["ISIN"],
+    "PriceDate": ["PriceDate", "Date", "Business Date", "As Of"],
+    "Price": ["Price", "Close", "Close Price", "Closing Price", "LTP"],
+    "Quantity": ["Quantity", "Volume", "Total Traded Quantity", "Traded Quantity"],
+}
+
+# Rows per executemany batch; keeps SQLite/Postgres parameter buffers bounded
+BATCH_SIZE = 10000
+
+# Assets per CASE update statement (two bind parameters per asset)
+UPDATE_CHUNK = 5000
+
+
+def read_price_file(contents: bytes, filename: str) -> pd.DataFrame:
+    if filename.endswith(".csv"):
+        df = pd.read_csv(io.BytesIO(contents))
+    else:
+        df = pd.read_excel(io.BytesIO(contents))
+    return normalize_columns(df)
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip() for c in df.columns]
+    lookup = {c.lower(): c for c in df.columns}
+    renames = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias.lower() in lookup:
+                renames[lookup[alias.lower()]] = field
+                break
+    return df.rename(columns=renames)
+
+
+def resolve_asset_ids(db: Session, tickers: Iterable[str] = (), isins: Iterable[str] = ()) -> Tuple[Dict[str, int], Dict[str, int]]:
+    # One IN query per key type; ISINs are mapped through the security masters to a ticker
+    tickers = {t for t in tickers if t}
+    isins = {i for i in isins if i}
+
+    isin_to_ticker = {}
+    if isins:
+        for isin, ticker in db.execute(select(EquityMaster.ISIN, EquityMaster.TickerNSE).where(EquityMaster.ISIN.in_(isins))):
+            if ticker:
+                isin_to_ticker[isin] = ticker
+        for isin, ticker in db.execute(select(BondMaster.ISIN, BondMaster.Ticker).where(BondMaster.ISIN.in_(isins))):
+            if ticker:
+                isin_to_ticker.setdefault(isin, ticker)
+
+    lookup = tickers | set(isin_to_ticker.values())
+    ticker_ids = {}
+    if lookup:
+        ticker_ids = dict(db.execute(select(Asset.TickerSymbol, Asset.AssetID).where(Asset.TickerSymbol.in_(lookup))).all())
+
+    isin_ids = {isin: ticker_ids[t] for isin, t in isin_to_ticker.items() if t in ticker_ids}
+    return {t: ticker_ids[t] for t in tickers if t in ticker_ids}, isin_ids
+
+
+def clean_identifiers(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    values = df[column].fillna("").astype(str).str.strip().str.upper()
+    return values.where(~values.isin(["NAN", "NONE"]), "")
+
+
+def map_asset_ids(db: Session, df: pd.DataFrame) -> Tuple[pd.Series, List[str]]:
+    # Returns an AssetID series aligned with df (NaN where unresolved) and the unknown identifiers
+    tickers = clean_identifiers(df, "TickerSymbol")
+    isins = clean_identifiers(df, "ISIN")
+
+    ticker_ids, isin_ids = resolve_asset_ids(db, tickers.unique(), isins.unique())
+    asset_ids = tickers.map(ticker_ids)
+    asset_ids = asset_ids.fillna(isins.map(isin_ids))
+
+    unresolved = asset_ids.isna()
+    unknown = tickers[unresolved].where(tickers[unresolved] != "", isins[unresolved])
+    return asset_ids, sorted(set(unknown) - {""})
+
+
+def upsert_prices(db: Session, frame: pd.DataFrame):
+    # Goes straight to the DBAPI cursor: ORM/Core parameter processing costs more than the insert itself
+    if frame.empty:
+        return
+    frame = frame.assign(PriceDate=pd.to_datetime(frame["PriceDate"]).dt.strftime("%Y-%m-%d"))
+    rows = list(zip(
+        frame["AssetID"].tolist(),
+        frame["PriceDate"].tolist(),
+        frame["Price"].tolist(),
+        [None if q != q else q for q in frame["Quantity"].tolist()],
+    ))
+    cursor = db.connection().connection.cursor()
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            from psycopg2.extras import execute_values
+            execute_values(
+                cursor,
+                'INSERT INTO market_data ("AssetID", "PriceDate", "Price", "Quantity") VALUES %s '
+                'ON CONFLICT ("AssetID", "PriceDate") DO UPDATE SET "Price" = EXCLUDED."Price", "Quantity" = EXCLUDED."Quantity"',
+                rows,
+                page_size=BATCH_SIZE,
+            )
+        else:
+            for i in range(0, len(rows), BATCH_SIZE):
+                cursor.executemany(
+                    'INSERT INTO market_data ("AssetID", "PriceDate", "Price", "Quantity") VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT ("AssetID", "PriceDate") DO UPDATE SET "Price" = excluded."Price", "Quantity" = excluded."Quantity"',
+                    rows[i:i + BATCH_SIZE],
+                )
+    finally:
+        cursor.close()
+
+
+def load_price_history(db: Session, df: pd.DataFrame) -> dict:
+    df = normalize_columns(df)
+    missing = [c for c in ("PriceDate", "Price") if c not in df.columns]
+    if "TickerSymbol" not in df.columns and "ISIN" not in df.columns:
+        missing.append("TickerSymbol/ISIN")
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    asset_ids, unknown = map_asset_ids(db, df)
+    dates = pd.to_datetime(df["PriceDate"], errors="coerce")
+    prices = pd.to_numeric(df["Price"], errors="coerce")
+    if "Quantity" in df.columns:
+        quantities = pd.to_numeric(df["Quantity"], errors="coerce")
+    else:
+        quantities = pd.Series(np.nan, index=df.index)
+
+    valid = asset_ids.notna() & dates.notna() & prices.notna()
+    invalid_rows = int((asset_ids.notna() & ~valid).sum())
+
+    frame = pd.DataFrame({
+        "AssetID": asset_ids[valid].astype(np.int64),
+        "PriceDate": dates[valid],
+        "Price": prices[valid].astype(float),
+        "Quantity": quantities[valid].astype(float),
+    })
+    # Last row wins when a file repeats an (asset, date) pair
+    frame = frame.drop_duplicates(subset=["AssetID", "PriceDate"], keep="last")
+
+    upsert_prices(db, frame)
+    db.commit()
+
+    return {
+        "rows_loaded": len(frame),
+        "assets": int(frame["AssetID"].nunique()),
+        "invalid_rows": invalid_rows,
+        "unknown_tickers": unknown,
+    }
+
+
+def day_number_sql(db: Session) -> str:
+    # Days since 1970-01-01 computed in SQL, so rows arrive as plain integers
+    if db.get_bind().dialect.name == "postgresql":
+        return '("PriceDate" - DATE \'1970-01-01\')'
+    return 'CAST(julianday("PriceDate") - 2440587.5 AS INTEGER)'
+
+
+def price_matrix(db: Session, asset_ids: List[int], start: Optional[date] = None, end: Optional[date] = None, fill: bool = True):
+    """Aligned (dates x assets) price matrix; NaN where an asset has no price on a date."""
+    asset_ids = np.unique(np.asarray(asset_ids, dtype=np.int64))
+    if len(asset_ids) == 0:
+        return np.array([], dtype="datetime64[D]"), asset_ids, np.empty((0, 0))
+
+    # Values are typed (int64 ids, date objects) so they are inlined; the raw cursor skips
+    # per-row Row construction, which dominates for a few hundred thousand rows
+    where = [f'"AssetID" IN ({",".join(str(a) for a in asset_ids.tolist())})', '"Price" IS NOT NULL']
+    if start:
+        where.append(f"\"PriceDate\" >= '{start.isoformat()}'")
+    if end:
+        where.append(f"\"PriceDate\" <= '{end.isoformat()}'")
+    sql = f'SELECT "AssetID", {day_number_sql(db)}, "Price" FROM market_data WHERE {" AND ".join(where)}'
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    if not rows:
+        return np.array([], dtype="datetime64[D]"), asset_ids, np.empty((0, len(asset_ids)))
+
+    data = np.fromiter(rows, dtype=[("asset", np.int64), ("day", np.int64), ("price", np.float64)], count=len(rows))
+    days, date_idx = np.unique(data["day"], return_inverse=True)
+    asset_idx = np.searchsorted(asset_ids, data["asset"])
+
+    matrix = np.full((len(days), len(asset_ids)), np.nan)
+    matrix[date_idx, asset_idx] = data["price"]
+
+    if fill:
+        matrix = forward_fill(matrix)
+    return days.astype("datetime64[D]"), asset_ids, matrix
+
+
+def prices_as_of(db: Session, asset_ids: np.ndarray, day: date) -> np.ndarray:
+    # Last close on or before `day` for each asset (NaN if none); one PK seek per asset
+    latest = (
+        select(MarketData.AssetID, func.max(MarketData.PriceDate).label("PriceDate"))
+        .where(MarketData.AssetID.in_(np.asarray(asset_ids).tolist()), MarketData.PriceDate <= day)
+        .group_by(MarketData.AssetID)
+        .subquery()
+    )
+    rows = db.execute(
+        select(MarketData.AssetID, MarketData.Price).join(
+            latest, (MarketData.AssetID == latest.c.AssetID) & (MarketData.PriceDate == latest.c.PriceDate)
+        )
+    ).all()
+    result = np.full(len(asset_ids), np.nan)
+    for asset_id, price in rows:
+        if price is not None:
+            result[np.searchsorted(asset_ids, asset_id)] = price
+    return result
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    # Carry the last known price down each column (non-trading days, suspended scrips)
+    if matrix.size == 0:
+        return matrix
+    idx = np.where(np.isnan(matrix), 0, np.arange(matrix.shape[0])[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = matrix[idx, np.arange(matrix.shape[1])]
+    # Leading NaNs (before first price) stay NaN
+    return filled
+
+
+def apply_price_feed(db: Session, df: pd.DataFrame, price_date: Optional[date] = None) -> dict:
+    # End-of-day feed: one ticker/ISIN per row. Asset prices and the day's history row
+    # are written in a single transaction; nothing is applied if any statement fails.
+    df = normalize_columns(df)
+    missing = [] if "Price" in df.columns else ["Price"]
+    if "TickerSymbol" not in df.columns and "ISIN" not in df.columns:
+        missing.append("TickerSymbol/ISIN")
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    asset_ids, unknown = map_asset_ids(db, df)
+    prices = pd.to_numeric(df["Price"], errors="coerce")
+    if "PriceDate" in df.columns:
+        dates = pd.to_datetime(df["PriceDate"], errors="coerce").fillna(pd.Timestamp(price_date or date.today()))
+    else:
+        dates = pd.Series(pd.Timestamp(price_date or date.today()), index=df.index)
+    quantities = pd.to_numeric(df["Quantity"], errors="coerce") if "Quantity" in df.columns else pd.Series(np.nan, index=df.index)
+
+    valid = asset_ids.notna() & prices.notna() & (prices > 0)
+    frame = pd.DataFrame({
+        "AssetID": asset_ids[valid].astype(np.int64),
+        "PriceDate": dates[valid],
+        "Price": prices[valid].astype(float),
+        "Quantity": quantities[valid].astype(float),
+    }).drop_duplicates(subset=["AssetID", "PriceDate"], keep="last")
+
+    # CurrentPrice takes the latest dated price per asset
+    latest = frame.sort_values("PriceDate").drop_duplicates(subset=["AssetID"], keep="last")
+    price_by_id = dict(zip(latest["AssetID"].tolist(), latest["Price"].tolist()))
+
+    try:
+        update_current_prices(db, price_by_id)
+        upsert_prices(db, frame)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    epoch = bump_epoch("prices")
+    return {
+        "updated": len(price_by_id),
+        "history_rows": len(frame),
+        "invalid_rows": int((asset_ids.notna() & ~valid).sum()),
+        "unknown_tickers": unknown,
+        "epoch": epoch,
+    }
+
+
+def update_current_prices(db: Session, price_by_id: Dict[int, float]):
+    # UPDATE assets SET CurrentPrice = CASE AssetID WHEN .. THEN .. END WHERE AssetID IN (..)
+    items = list(price_by_id.items())
+    for i in range(0, len(items), UPDATE_CHUNK):
+        chunk = dict(items[i:i + UPDATE_CHUNK])
+        db.execute(
+            update(Asset)
+            .where(Asset.AssetID.in_(list(chunk)))
+            .values(CurrentPrice=case(chunk, value=Asset.AssetID))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def ingest_price_drop(path: str) -> List[dict]:
+    # File-drop feed: a single file, or every CSV/XLSX waiting in a directory.
+    # Processed files move to processed/ (or failed/) next to the drop directory.
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith((".csv", ".xlsx")))
+        drop_dir = path
+    else:
+        files = [path]
+        drop_dir = None
+
+    from backend.models import SessionLocal
+    results = []
+    for file_path in files:
+        db = SessionLocal()
+        try:
+            with open(file_path, "rb") as f:
+                df = read_price_file(f.read(), os.path.basename(file_path))
+            result = {"file": os.path.basename(file_path), **apply_price_feed(db, df)}
+            outcome = "processed"
+        except Exception as e:
+            result = {"file": os.path.basename(file_path), "error": str(e)}
+            outcome = "failed"
+        finally:
+            db.close()
+        if drop_dir:
+            target = os.path.join(drop_dir, outcome)
+            os.makedirs(target, exist_ok=True)
+            os.replace(file_path, os.path.join(target, os.path.basename(file_path)))
+        results.append(result)
+    return results
+
+
+def load_price_file(path: str) -> dict:
+    from backend.models import SessionLocal
+    with open(path, "rb") as f:
+        df = read_price_file(f.read(), os.path.basename(path))
+    db = SessionLocal()
+    try:
+        return load_price_history(db, df)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # python -m backend.market_data history <history.csv|xlsx> [...]
+    # python -m backend.market_data feed <eod.csv|xlsx|drop directory> [...]
+    command, paths = sys.argv[1], sys.argv[2:]
+    for path in paths:
+        if command == "feed":
+            for result in ingest_price_drop(path):
+                print(result)
+        else:
+            print(f"{path}: {load_price_file(path)}")
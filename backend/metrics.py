@@ -0,0 +1,225 @@
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# In-process metrics rendered in the Prometheus text format; nothing to run alongside.
+# Each uvicorn worker keeps its own registry, so scrape every worker (or run one).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["Metric"] = []
+_collectors: List[Callable[[], None]] = []
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def labels(self, *values) -> "Child":
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return Child(self, tuple(str(v) for v in values))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines += self._render_value(key, value)
+        return lines
+
+    def _render_value(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Child:
+    __slots__ = ("metric", "key")
+
+    def __init__(self, metric: Metric, key: Tuple[str, ...]):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount: float = 1.0):
+        self.metric._add(self.key, amount)
+
+    def dec(self, amount: float = 1.0):
+        self.metric._add(self.key, -amount)
+
+    def set(self, value: float):
+        self.metric._set(self.key, value)
+
+    def observe(self, value: float):
+        self.metric._observe(self.key, value)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _add(self, key, amount):
+        if amount < 0:
+            raise ValueError("Counters only go up")
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def inc(self, amount: float = 1.0):
+        self._add((), amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _add(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0):
+        self._add((), amount)
+
+    def dec(self, amount: float = 1.0):
+        self._add((), -amount)
+
+    def set(self, value: float):
+        self._set((), value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def _observe(self, key, value):
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., sum]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-1] += value
+
+    def observe(self, value: float):
+        self._observe((), value)
+
+    def _render_value(self, key, state) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, state):
+            cumulative += count
+            le = f'le="{_number(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_number(state[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def collector(func: Callable[[], None]) -> Callable[[], None]:
+    """Register a callback that refreshes gauges right before each scrape."""
+    _collectors.append(func)
+    return func
+
+
+def render() -> str:
+    for func in _collectors:
+        try:
+            func()
+        except Exception as e:
+            print(f"Metrics collector failed: {e}")
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route template, method and status.", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a database connection from the pool.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0),
+)
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Database connections currently checked out.")
+UPLOAD_ROWS = Counter("upload_rows_total", "Rows processed by bulk uploads.", ("kind",))
+UPLOAD_RATE = Histogram(
+    "upload_rows_per_second", "Throughput of each bulk upload.", ("kind",),
+    buckets=(100, 500, 1000, 5000, 10000, 50000, 100000, 500000),
+)
+CACHE_HITS = Counter("cache_hits_total", "Cache lookups answered from the cache.", ("cache",))
+CACHE_MISSES = Counter("cache_misses_total", "Cache lookups that had to compute the value.", ("cache",))
+POOL_PENDING = Gauge("process_pool_pending_tasks", "Tasks submitted to the process pool and not yet finished.", ("pool",))
+
+
+def record_upload(kind: str, rows: int, started: float):
+    UPLOAD_ROWS.labels(kind).inc(rows)
+    elapsed = time.perf_counter() - started
+    if rows and elapsed > 0:
+        UPLOAD_RATE.labels(kind).observe(rows / elapsed)
+
+
+def cache_lookup(cache: str, hit: bool):
+    (CACHE_HITS if hit else CACHE_MISSES).labels(cache).inc()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request under its route template, not the raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up the series count
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            REQUEST_LATENCY.labels(method, template).observe(time.perf_counter() - started)
+            REQUESTS.labels(method, template, status["code"]).inc()
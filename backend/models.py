@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Date, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Date, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -20,6 +20,29 @@ if DATABASE_URL.startswith("postgres://"):
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 4. Async driver for the same database (aiosqlite / asyncpg), used by the async handlers
+def async_database_url(url):
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql+psycopg2:") or url.startswith("postgresql:"):
+        url = "postgresql+asyncpg:" + url.split(":", 1)[1]
+        # asyncpg spells libpq's sslmode as ssl
+        return url.replace("sslmode=", "ssl=")
+    return url
+
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+
+_async_sessionmaker = None
+
+def get_async_sessionmaker():
+    # Created on first use so the sync-only paths (scripts, CLIs) never need the async driver installed
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        _async_sessionmaker = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
 Base = declarative_base()
 
 class User(Base):
@@ -74,6 +97,16 @@ class Asset(Base):
     holdings = relationship("Holding", back_populates="asset")
     transactions = relationship("Transaction", back_populates="asset")
 
+class MarketData(Base):
+    __tablename__ = "market_data"
+    # Clustered on (AssetID, PriceDate) so range scans per asset stay sequential
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    AssetID = Column(Integer, ForeignKey("assets.AssetID"), primary_key=True)
+    PriceDate = Column(Date, primary_key=True)
+    Price = Column(Float)
+    Quantity = Column(Float) # Traded volume
+
 class Holding(Base):
     __tablename__ = "holdings"
 
@@ -89,6 +122,7 @@ class Holding(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (Index("ix_transactions_portfolio_tradedate", "PortfolioID", "TradeDate"),)
 
     TransactionID = Column(Integer, primary_key=True, index=True)
     PortfolioID = Column(Integer, ForeignKey("portfolios.PortfolioID"))
@@ -113,6 +147,36 @@ class Transaction(Base):
     portfolio = relationship("Portfolio", back_populates="transactions")
     asset = relationship("Asset", back_populates="transactions")
 
+class RealizedGain(Base):
+    __tablename__ = "realized_gains"
+
+    ID = Column(Integer, primary_key=True, index=True)
+    PortfolioID = Column(Integer, ForeignKey("portfolios.PortfolioID"), index=True)
+    AssetID = Column(Integer, ForeignKey("assets.AssetID"))
+    TransactionID = Column(Integer, ForeignKey("transactions.TransactionID")) # The sell
+    SellDate = Column(Date)
+    Quantity = Column(Integer)
+    Proceeds = Column(Float) # Amount less fees
+    CostBasis = Column(Float)
+    Gain = Column(Float)
+    ShortTermGain = Column(Float) # Lots held 365 days or less
+    LongTermGain = Column(Float)
+    Method = Column(String) # FIFO, AVERAGE
+
+class NavSnapshot(Base):
+    __tablename__ = "nav_snapshots"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    PortfolioID = Column(Integer, ForeignKey("portfolios.PortfolioID"), primary_key=True)
+    SnapshotDate = Column(Date, primary_key=True)
+    NAV = Column(Float)
+    EquityValue = Column(Float)
+    DebtValue = Column(Float)
+    MutualFundValue = Column(Float)
+    OtherValue = Column(Float)
+    NetFlow = Column(Float) # Buys minus sells on the day
+    ComputedAt = Column(DateTime, default=datetime.utcnow)
+
 class EquityMaster(Base):
     __tablename__ = "equity_masters"
 
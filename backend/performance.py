@@ -0,0 +1,243 @@
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.market_data import forward_fill, price_matrix, prices_as_of
+from backend.models import Asset, Transaction
+
+DAYS_PER_YEAR = 365.0
+
+
+class ValuationHistory:
+    """Daily values and external cash flows for a set of portfolios on a common date axis.
+
+    values/flows are (portfolios x dates). Flows are from the portfolio's point of view:
+    buys bring money in (+), sells take money out (-).
+    """
+
+    def __init__(self, dates, portfolio_ids, values, flows, pair_portfolio, pair_asset, pair_values):
+        self.dates = dates
+        self.portfolio_ids = portfolio_ids
+        self.values = values
+        self.flows = flows
+        # Per (portfolio, asset) position values, for breakdowns by asset attributes
+        self.pair_portfolio = pair_portfolio
+        self.pair_asset = pair_asset
+        self.pair_values = pair_values
+
+    def row(self, portfolio_id: int) -> int:
+        return int(np.searchsorted(self.portfolio_ids, portfolio_id))
+
+
+def signed_trades(db: Session, portfolio_ids: List[int], end: Optional[date] = None):
+    stmt = select(
+        Transaction.PortfolioID, Transaction.AssetID, Transaction.TradeDate, Transaction.Type,
+        Transaction.Quantity, Transaction.Price, Transaction.Amount, Transaction.BrokerFees
+    ).where(Transaction.PortfolioID.in_(portfolio_ids), Transaction.AssetID.isnot(None), Transaction.TradeDate.isnot(None))
+    if end:
+        stmt = stmt.where(Transaction.TradeDate <= end)
+    rows = db.execute(stmt).all()
+    if not rows:
+        return None
+
+    pids, aids, days, types, qty, price, amount, fees = zip(*rows)
+    side = np.array([1.0 if (t or "").strip().lower().startswith("b") else -1.0 if (t or "").strip().lower().startswith("s") else 0.0 for t in types])
+    qty = np.array([q or 0 for q in qty], dtype=float)
+    price = np.array([p or 0.0 for p in price], dtype=float)
+    gross = np.array([a if a is not None else np.nan for a in amount], dtype=float)
+    gross = np.where(np.isnan(gross), qty * price, np.abs(gross))
+    fees = np.array([f or 0.0 for f in fees], dtype=float)
+
+    keep = side != 0
+    return {
+        "portfolio": np.array(pids, dtype=np.int64)[keep],
+        "asset": np.array(aids, dtype=np.int64)[keep],
+        "day": np.array(days, dtype="datetime64[D]")[keep],
+        "quantity": (side * qty)[keep],
+        # Buys cost amount + fees, sells return amount - fees
+        "flow": (side * gross + fees)[keep],
+        "price": price[keep],
+    }
+
+
+def build_history(db: Session, portfolio_ids: List[int], end: Optional[date] = None, start: Optional[date] = None) -> Optional[ValuationHistory]:
+    # With `start`, only dates from `start` on are valued: earlier trades roll into the opening
+    # positions and only prices from the window (plus the last close before it) are read.
+    portfolio_ids = np.unique(np.asarray(portfolio_ids, dtype=np.int64))
+    trades = signed_trades(db, portfolio_ids.tolist(), end)
+    if trades is None:
+        return None
+
+    asset_ids = np.unique(trades["asset"])
+    window_start = trades["day"].min()
+    if start and np.datetime64(start, "D") > window_start:
+        window_start = np.datetime64(start, "D")
+    dates, asset_ids, prices = price_matrix(db, asset_ids.tolist(), window_start.astype(object), end, fill=False)
+
+    # Value on every priced date, every trade date and the valuation date itself
+    valuation_day = np.datetime64(end or date.today(), "D")
+    in_window = trades["day"] >= window_start
+    all_dates = np.unique(np.concatenate([dates, trades["day"][in_window], [window_start, valuation_day]]))
+    aligned = np.full((len(all_dates), len(asset_ids)), np.nan)
+    aligned[np.searchsorted(all_dates, dates)] = prices
+    if start and not in_window.all():
+        opening = prices_as_of(db, asset_ids, window_start.astype(object))
+        aligned[0] = np.where(np.isnan(aligned[0]), opening, aligned[0])
+    prices = fill_prices(db, aligned, asset_ids, trades)
+    dates = all_dates
+
+    # Positions: one row per (portfolio, asset) pair, quantity deltas accumulated over dates
+    pair_keys, pair_idx = np.unique(np.stack([trades["portfolio"], trades["asset"]], axis=1), axis=0, return_inverse=True)
+    pair_idx = pair_idx.ravel()
+    t_idx = np.searchsorted(dates, trades["day"])
+    deltas = np.zeros((len(pair_keys), len(dates)))
+    np.add.at(deltas, (pair_idx, t_idx), trades["quantity"])
+    positions = np.cumsum(deltas, axis=1)
+    pair_values = positions * prices[:, np.searchsorted(asset_ids, pair_keys[:, 1])].T
+
+    # Pairs are sorted by portfolio, so each portfolio is a contiguous block of rows
+    p_rows = np.searchsorted(portfolio_ids, pair_keys[:, 0])
+    values = np.zeros((len(portfolio_ids), len(dates)))
+    starts = np.flatnonzero(np.r_[True, p_rows[1:] != p_rows[:-1]])
+    values[p_rows[starts]] = np.add.reduceat(pair_values, starts, axis=0)
+
+    # Trades before the window are already in the opening value, not flows
+    flows = np.zeros((len(portfolio_ids), len(dates)))
+    np.add.at(flows, (np.searchsorted(portfolio_ids, trades["portfolio"][in_window]), t_idx[in_window]), trades["flow"][in_window])
+
+    return ValuationHistory(dates, portfolio_ids, values, flows, pair_keys[:, 0], pair_keys[:, 1], pair_values)
+
+
+def fill_prices(db: Session, prices: np.ndarray, asset_ids: np.ndarray, trades: dict) -> np.ndarray:
+    # Gaps are carried forward. Before an asset's first recorded close, the trade price is used,
+    # and assets with no history at all fall back to Asset.CurrentPrice.
+    cols = np.searchsorted(asset_ids, trades["asset"])
+    order = np.argsort(trades["day"], kind="stable")
+    first_cols, first_pos = np.unique(cols[order], return_index=True)
+    seed = np.full(len(asset_ids), np.nan)
+    seed[first_cols] = trades["price"][order[first_pos]]
+
+    current = dict(db.execute(select(Asset.AssetID, Asset.CurrentPrice).where(Asset.AssetID.in_(asset_ids.tolist()))).all())
+    missing = np.isnan(prices).all(axis=0)
+    seed = np.where(missing, [current.get(a) or np.nan for a in asset_ids.tolist()], seed)
+    seed = np.where(np.isnan(seed), 0.0, seed)
+
+    prices = forward_fill(prices)
+    leading = np.isnan(prices)
+    prices[leading] = np.broadcast_to(seed, prices.shape)[leading]
+    return prices
+
+
+def time_weighted_returns(values: np.ndarray, flows: np.ndarray) -> np.ndarray:
+    # Daily returns with flows valued at their trade price: r_t = (V_t - F_t) / V_{t-1} - 1.
+    # On a funding day (V_{t-1} == 0) the flow itself is the base: r_t = V_t / F_t - 1.
+    prev = np.concatenate([np.zeros((values.shape[0], 1)), values[:, :-1]], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily = np.where(
+            prev > 0,
+            (values - flows) / prev - 1.0,
+            np.where(flows > 0, values / flows - 1.0, 0.0),
+        )
+    return daily
+
+
+def xirr(flows: np.ndarray, years: np.ndarray, guess: float = 0.1, tol: float = 1e-9, max_iter: int = 100) -> np.ndarray:
+    """Vectorized XIRR: one rate per row of `flows` (investor view, outflows negative).
+
+    `years` is the common time axis in years from the first date. Newton steps are taken
+    for all rows at once; rows that fail to converge (or have no sign change) return NaN.
+    """
+    flows = np.atleast_2d(flows)
+    rate = np.full(flows.shape[0], guess)
+    valid = (flows > 0).any(axis=1) & (flows < 0).any(axis=1)
+    active = valid.copy()
+    t = years[None, :]
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        r = rate[active]
+        f = flows[active]
+        disc = np.exp(-t * np.log1p(r)[:, None])
+        npv = (f * disc).sum(axis=1)
+        d_npv = (-t * f * disc).sum(axis=1) / (1.0 + r)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(d_npv != 0, npv / d_npv, 0.0)
+        new_rate = np.maximum(r - step, -0.9999)
+        done = np.abs(new_rate - r) < tol
+        rate[active] = new_rate
+        idx = np.flatnonzero(active)
+        active[idx[done | ~np.isfinite(new_rate)]] = False
+
+    rate[~valid | ~np.isfinite(rate)] = np.nan
+    # Anything still moving after max_iter did not converge
+    rate[active] = np.nan
+    return rate
+
+
+def period_start_index(dates: np.ndarray, period_start: np.datetime64) -> int:
+    # Index of the last date before the period starts (-1 if the history starts inside it)
+    return int(np.searchsorted(dates, period_start)) - 1
+
+
+def compute_performance(db: Session, portfolio_ids: List[int], as_of: Optional[date] = None) -> Dict[int, dict]:
+    as_of = as_of or date.today()
+    history = build_history(db, portfolio_ids, as_of)
+    results = {}
+    if history is None:
+        return results
+
+    daily = time_weighted_returns(history.values, history.flows)
+    growth = np.cumprod(1.0 + daily, axis=1)
+    end_growth = growth[:, -1]
+
+    periods = {
+        "MTD": np.datetime64(as_of.replace(day=1), "D"),
+        "QTD": np.datetime64(as_of.replace(month=3 * ((as_of.month - 1) // 3) + 1, day=1), "D"),
+        "YTD": np.datetime64(as_of.replace(month=1, day=1), "D"),
+    }
+    period_returns = {}
+    for name, start in periods.items():
+        i = period_start_index(history.dates, start)
+        base = growth[:, i] if i >= 0 else np.ones(len(history.portfolio_ids))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            period_returns[name] = np.where(base > 0, end_growth / base - 1.0, np.nan)
+
+    # Money-weighted: investor contributes buys (-), receives sells (+) and the closing value (+)
+    years = (history.dates - history.dates[0]).astype(float) / DAYS_PER_YEAR
+    investor = -history.flows.copy()
+    investor[:, -1] += history.values[:, -1]
+    mwr = xirr(investor, years)
+
+    # Inception per portfolio: first date with a flow
+    has_flow = history.flows != 0
+    inception = np.where(has_flow.any(axis=1), has_flow.argmax(axis=1), 0)
+    span_years = (history.dates[-1] - history.dates[inception]).astype(float) / DAYS_PER_YEAR
+    since_inception = end_growth - 1.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        annualized = np.where(span_years >= 1.0, np.power(end_growth, 1.0 / np.maximum(span_years, 1e-9)) - 1.0, since_inception)
+
+    for i, pid in enumerate(history.portfolio_ids.tolist()):
+        results[pid] = {
+            "PortfolioID": pid,
+            "InceptionDate": str(history.dates[inception[i]]),
+            "AsOf": str(history.dates[-1]),
+            "MarketValue": round(float(history.values[i, -1]), 2),
+            "NetContributions": round(float(history.flows[i].sum()), 2),
+            "TWR": nan_to_none(since_inception[i]),
+            "AnnualizedTWR": nan_to_none(annualized[i]),
+            "XIRR": nan_to_none(mwr[i]),
+            "MTD": nan_to_none(period_returns["MTD"][i]),
+            "QTD": nan_to_none(period_returns["QTD"][i]),
+            "YTD": nan_to_none(period_returns["YTD"][i]),
+            "SinceInception": nan_to_none(since_inception[i]),
+        }
+    return results
+
+
+def nan_to_none(value) -> Optional[float]:
+    value = float(value)
+    return None if not np.isfinite(value) else round(value, 8)
@@ -0,0 +1,143 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from backend.models import Holding, Transaction
+
+# Holdings are a fold over transactions, one state per (PortfolioID, AssetID):
+# [quantity, total cost, opened]. Buys add quantity and cost (amount + fees);
+# sells release cost at the running average.
+Key = Tuple[int, int]
+
+# Keys per IN (...) lookup when loading touched positions
+LOOKUP_CHUNK = 500
+
+
+def fold_trade(state: list, side: str, quantity: int, amount: float, fees: float, trade_date=None):
+    qty, cost, opened = state
+    if side == "Buy":
+        if qty <= 0:
+            opened, cost = trade_date, 0.0
+        qty += quantity
+        cost += amount + fees
+    else:
+        if qty > 0:
+            cost -= cost * min(quantity, qty) / qty
+        qty -= quantity
+        if qty <= 0:
+            cost = 0.0
+    state[0], state[1], state[2] = qty, cost, opened
+
+
+def fold(trades: Iterable[tuple], states: Dict[Key, list]) -> Dict[Key, list]:
+    # trades: (PortfolioID, AssetID, TradeDate, Type, Quantity, Price, Amount, BrokerFees), already ordered
+    for pid, aid, trade_date, side, qty, price, amount, fees in trades:
+        state = states.get((pid, aid))
+        if state is None:
+            state = states[(pid, aid)] = [0, 0.0, None]
+        if amount is None:
+            amount = (qty or 0) * (price or 0.0)
+        fold_trade(state, side, qty or 0, abs(amount), fees or 0.0, trade_date)
+    return states
+
+
+def load_positions(db: Session, keys: List[Key]) -> Dict[Key, List[Holding]]:
+    rows: Dict[Key, List[Holding]] = {}
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[i:i + LOOKUP_CHUNK]
+        for h in db.execute(
+            select(Holding).where(tuple_(Holding.PortfolioID, Holding.AssetID).in_(chunk)).order_by(Holding.HoldingID)
+        ).scalars():
+            rows.setdefault((h.PortfolioID, h.AssetID), []).append(h)
+    return rows
+
+
+def write_positions(db: Session, states: Dict[Key, list], existing: Dict[Key, List[Holding]]):
+    updates, inserts, deletes = [], [], []
+    for key, (qty, cost, opened) in states.items():
+        current = existing.get(key, [])
+        # Legacy duplicates for one position collapse into the oldest row
+        deletes += [h.HoldingID for h in current[1:]]
+        if qty == 0:
+            deletes += [h.HoldingID for h in current[:1]]
+            continue
+        avg = cost / qty if qty > 0 else 0.0
+        if current:
+            updates.append({"HoldingID": current[0].HoldingID, "Quantity": int(qty), "PurchasePrice": avg})
+        else:
+            opened_at = datetime.combine(opened, datetime.min.time()) if opened else datetime.utcnow()
+            inserts.append({"PortfolioID": key[0], "AssetID": key[1], "Quantity": int(qty), "PurchasePrice": avg, "PurchaseDate": opened_at})
+
+    if updates:
+        db.execute(update(Holding), updates)
+    if inserts:
+        db.execute(insert(Holding.__table__), inserts)
+    if deletes:
+        db.execute(delete(Holding).where(Holding.HoldingID.in_(deletes)).execution_options(synchronize_session=False))
+
+
+def apply_trades(db: Session, frame: pd.DataFrame) -> List[int]:
+    """Fold a batch of new trades into holdings; only the positions they touch are read or written.
+
+    The batch is applied in trade-date order on top of the stored position. Trades dated
+    before ones already applied are folded as of now; rebuild_positions replays strict
+    date order when an exact audit figure is needed.
+    """
+    frame = frame[frame["AssetID"].notna()]
+    if frame.empty:
+        return []
+    frame = frame.sort_values("TradeDate", kind="stable")
+    trades = list(zip(
+        frame["PortfolioID"].astype(int), frame["AssetID"].astype(int), frame["TradeDate"], frame["Type"],
+        frame["Quantity"].astype(int), frame["Price"], frame["Amount"], frame["BrokerFees"],
+    ))
+
+    keys = sorted({(t[0], t[1]) for t in trades})
+    existing = load_positions(db, keys)
+    states = {}
+    for key, holdings in existing.items():
+        qty = sum(h.Quantity or 0 for h in holdings)
+        cost = sum((h.Quantity or 0) * (h.PurchasePrice or 0.0) for h in holdings)
+        opened = holdings[0].PurchaseDate.date() if holdings[0].PurchaseDate else None
+        states[key] = [qty, cost, opened]
+
+    fold(trades, states)
+    write_positions(db, states, existing)
+    return sorted({k[0] for k in keys})
+
+
+def rebuild_positions(db: Session, portfolio_ids: Optional[List[int]] = None, dry_run: bool = False) -> dict:
+    # Replays every transaction in (TradeDate, TransactionID) order; same input, same holdings
+    stmt = select(
+        Transaction.PortfolioID, Transaction.AssetID, Transaction.TradeDate, Transaction.Type,
+        Transaction.Quantity, Transaction.Price, Transaction.Amount, Transaction.BrokerFees
+    ).where(Transaction.AssetID.isnot(None), Transaction.Type.in_(["Buy", "Sell"]))
+    if portfolio_ids:
+        stmt = stmt.where(Transaction.PortfolioID.in_(portfolio_ids))
+    states = fold(db.execute(stmt.order_by(Transaction.TradeDate, Transaction.TransactionID)), {})
+
+    # Only portfolios with a ledger are rebuilt; positions loaded directly stay as they are
+    rebuilt = sorted({k[0] for k in states})
+    existing: Dict[Key, List[Holding]] = {}
+    if rebuilt:
+        for h in db.execute(select(Holding).where(Holding.PortfolioID.in_(rebuilt)).order_by(Holding.HoldingID)).scalars():
+            existing.setdefault((h.PortfolioID, h.AssetID), []).append(h)
+
+    differences = []
+    for key in sorted(set(states) | set(existing)):
+        expected = states.get(key, [0, 0.0, None])[0]
+        stored = sum(h.Quantity or 0 for h in existing.get(key, []))
+        if expected != stored:
+            differences.append({"PortfolioID": key[0], "AssetID": key[1], "Stored": stored, "Rebuilt": int(expected)})
+
+    if not dry_run:
+        # Positions with no trades at all in a rebuilt portfolio are closed
+        for key in existing:
+            states.setdefault(key, [0, 0.0, None])
+        write_positions(db, states, existing)
+        db.commit()
+
+    return {"portfolios": len(rebuilt), "positions": sum(1 for s in states.values() if s[0] != 0), "differences": differences}
@@ -0,0 +1,215 @@
+import os
+import shutil
+import threading
+from datetime import date
+from statistics import NormalDist
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.market_data import price_matrix
+from backend.metrics import cache_lookup
+from backend.models import Asset, Holding, MarketData, Portfolio
+from backend.valuation import on_epoch_change
+
+TRADING_DAYS = 252
+DEFAULT_LOOKBACK = 250
+
+RISK_CACHE_DIR = os.getenv("RISK_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "risk"))
+# Optional ticker used as the market for beta; defaults to an equal-weighted universe
+RISK_BENCHMARK = os.getenv("RISK_BENCHMARK")
+
+
+class RiskModel:
+    """Return history and covariance for the whole priced universe on one market date."""
+
+    def __init__(self, as_of, asset_ids, returns, cov, market):
+        self.as_of = as_of
+        self.asset_ids = asset_ids
+        self.returns = returns  # (days x assets) simple daily returns
+        self.cov = cov          # (assets x assets)
+        self.market = market    # (days,) benchmark returns
+        centered = returns - returns.mean(axis=0)
+        m = market - market.mean()
+        self.market_var = float(m @ m) / max(len(m) - 1, 1)
+        self.market_cov = centered.T @ m / max(len(m) - 1, 1)
+
+
+_models: Dict[tuple, RiskModel] = {}
+_lock = threading.Lock()
+
+
+def latest_market_date(db: Session) -> Optional[date]:
+    return db.execute(select(func.max(MarketData.PriceDate))).scalar()
+
+
+def cache_paths(as_of: date, lookback: int) -> Dict[str, str]:
+    stem = os.path.join(RISK_CACHE_DIR, f"{as_of.isoformat()}_{lookback}")
+    return {name: f"{stem}_{name}.npy" for name in ("ids", "returns", "cov", "market")}
+
+
+def get_risk_model(db: Session, as_of: Optional[date] = None, lookback: int = DEFAULT_LOOKBACK) -> Optional[RiskModel]:
+    as_of = as_of or latest_market_date(db)
+    if as_of is None:
+        return None
+    key = (as_of, lookback)
+    model = _models.get(key)
+    if model is not None:
+        cache_lookup("risk_model", True)
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = load_cached_model(as_of, lookback)
+            cache_lookup("risk_model", model is not None)
+            if model is None:
+                model = build_risk_model(db, as_of, lookback)
+            if model is not None:
+                _models[key] = model
+        else:
+            cache_lookup("risk_model", True)
+    return model
+
+
+def load_cached_model(as_of: date, lookback: int) -> Optional[RiskModel]:
+    paths = cache_paths(as_of, lookback)
+    if not all(os.path.exists(p) for p in paths.values()):
+        return None
+    # Memory-mapped: worker processes share the page cache instead of each holding a copy
+    arrays = {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
+    return RiskModel(as_of, arrays["ids"], arrays["returns"], arrays["cov"], arrays["market"])
+
+
+def build_risk_model(db: Session, as_of: date, lookback: int) -> Optional[RiskModel]:
+    asset_ids = [a for (a,) in db.execute(select(MarketData.AssetID).where(MarketData.PriceDate <= as_of).distinct())]
+    if not asset_ids:
+        return None
+
+    dates, ids, prices = price_matrix(db, asset_ids, end=as_of)
+    prices = prices[-(lookback + 1):]
+    if len(prices) < 3:
+        return None
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1.0
+    # Before an asset's first price (or while unpriced) its return is treated as flat
+    returns = np.where(np.isfinite(returns), returns, 0.0)
+    cov = np.cov(returns, rowvar=False).reshape(len(ids), len(ids))
+
+    if RISK_BENCHMARK:
+        bench = db.execute(select(Asset.AssetID).where(Asset.TickerSymbol == RISK_BENCHMARK)).scalar()
+        market = returns[:, np.searchsorted(ids, bench)] if bench in ids else returns.mean(axis=1)
+    else:
+        market = returns.mean(axis=1)
+
+    save_model(as_of, lookback, ids, returns, cov, market)
+    return RiskModel(as_of, ids, returns, cov, market)
+
+
+def save_model(as_of, lookback, ids, returns, cov, market):
+    try:
+        os.makedirs(RISK_CACHE_DIR, exist_ok=True)
+        for name, array in zip(("ids", "returns", "cov", "market"), (ids, returns, cov, market)):
+            path = cache_paths(as_of, lookback)[name]
+            # Write then rename so readers never map a half-written file
+            tmp = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(tmp, np.ascontiguousarray(array))
+            os.replace(tmp, path)
+    except OSError as e:
+        print(f"Risk cache write failed: {e}")
+
+
+def clear_risk_cache(*_):
+    with _lock:
+        _models.clear()
+        shutil.rmtree(RISK_CACHE_DIR, ignore_errors=True)
+
+
+@on_epoch_change
+def _invalidate_on_prices(epoch, reason, portfolio_ids):
+    # Restated prices change history the cached matrices were built from
+    if reason == "prices":
+        clear_risk_cache()
+
+
+def exposure_matrix(db: Session, asset_ids: np.ndarray, portfolio_ids: Optional[List[int]] = None):
+    # Current market value of every holding, as a (portfolios x assets) matrix in the model's asset order
+    stmt = select(Holding.PortfolioID, Holding.AssetID, func.sum(Holding.Quantity * Asset.CurrentPrice)).join(
+        Asset, Asset.AssetID == Holding.AssetID
+    ).group_by(Holding.PortfolioID, Holding.AssetID)
+    if portfolio_ids is not None:
+        stmt = stmt.where(Holding.PortfolioID.in_(portfolio_ids))
+    else:
+        stmt = stmt.where(Holding.PortfolioID.in_(select(Portfolio.PortfolioID)))
+    rows = db.execute(stmt).all()
+    if not rows:
+        return np.array([], dtype=np.int64), np.zeros((0, len(asset_ids))), np.zeros(0)
+
+    pids, aids, values = (np.array(c) for c in zip(*rows))
+    values = values.astype(float)
+    values[~np.isfinite(values)] = 0.0
+    portfolio_index = np.unique(pids.astype(np.int64))
+    rows_idx = np.searchsorted(portfolio_index, pids)
+    nav = np.bincount(rows_idx, weights=values, minlength=len(portfolio_index))
+
+    cols = np.searchsorted(asset_ids, aids)
+    covered = (cols < len(asset_ids)) & (asset_ids[np.minimum(cols, len(asset_ids) - 1)] == aids)
+    exposures = np.zeros((len(portfolio_index), len(asset_ids)))
+    np.add.at(exposures, (rows_idx[covered], cols[covered]), values[covered])
+    return portfolio_index, exposures, nav
+
+
+def compute_risk(db: Session, portfolio_ids: Optional[List[int]] = None, as_of: Optional[date] = None,
+                 confidence: float = 0.95, lookback: int = DEFAULT_LOOKBACK) -> Dict[int, dict]:
+    model = get_risk_model(db, as_of, lookback)
+    if model is None:
+        return {}
+
+    pids, exposures, nav = exposure_matrix(db, np.asarray(model.asset_ids), portfolio_ids)
+    if len(pids) == 0:
+        return {}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(nav[:, None] > 0, exposures / nav[:, None], 0.0)
+
+    # The whole book in a handful of matrix products
+    cov = np.asarray(model.cov)
+    w_cov = weights @ cov                              # (P x A)
+    variance = np.einsum("pa,pa->p", w_cov, weights)
+    vol = np.sqrt(np.maximum(variance, 0.0))
+    beta = weights @ np.asarray(model.market_cov) / model.market_var if model.market_var > 0 else np.full(len(pids), np.nan)
+    portfolio_returns = weights @ np.asarray(model.returns).T   # (P x days)
+    hist_var = -np.quantile(portfolio_returns, 1.0 - confidence, axis=1)
+    z = NormalDist().inv_cdf(confidence)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        contribution = np.where(vol[:, None] > 0, weights * w_cov / vol[:, None], 0.0)
+    covered_weight = weights.sum(axis=1)
+
+    tickers = dict(db.execute(select(Asset.AssetID, Asset.TickerSymbol).where(Asset.AssetID.in_(np.asarray(model.asset_ids).tolist()))).all())
+    asset_ids = np.asarray(model.asset_ids).tolist()
+
+    results = {}
+    for i, pid in enumerate(pids.tolist()):
+        held = np.flatnonzero(weights[i])
+        results[pid] = {
+            "PortfolioID": pid,
+            "AsOf": model.as_of.isoformat(),
+            "MarketValue": round(float(nav[i]), 2),
+            "DailyVolatility": float(vol[i]),
+            "AnnualVolatility": float(vol[i] * np.sqrt(TRADING_DAYS)),
+            "ParametricVaR": round(float(z * vol[i] * nav[i]), 2),
+            "HistoricalVaR": round(float(max(hist_var[i], 0.0) * nav[i]), 2),
+            "Beta": None if not np.isfinite(beta[i]) else float(beta[i]),
+            "Confidence": confidence,
+            # Share of value in assets with no price history (not in the risk numbers)
+            "UncoveredWeight": round(float(1.0 - covered_weight[i]), 6) if nav[i] > 0 else 0.0,
+            "RiskContributions": [
+                {"AssetID": asset_ids[a], "TickerSymbol": tickers.get(asset_ids[a]), "Weight": float(weights[i, a]), "Contribution": float(contribution[i, a])}
+                for a in held
+            ],
+        }
+    return results
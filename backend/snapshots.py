@@ -0,0 +1,119 @@
+import sys
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from backend.models import Asset, NavSnapshot, Transaction
+from backend.performance import build_history
+
+ASSET_CLASS_COLUMNS = {"Equity": "EquityValue", "Debt": "DebtValue", "Mutual Fund": "MutualFundValue"}
+
+
+def pending_windows(db: Session, as_of: date) -> Dict[int, date]:
+    # Portfolio -> first date that needs (re)computing
+    last_date = db.execute(select(func.max(NavSnapshot.SnapshotDate))).scalar()
+    last_run = db.execute(select(func.max(NavSnapshot.ComputedAt))).scalar()
+
+    first_trades = dict(db.execute(
+        select(Transaction.PortfolioID, func.min(Transaction.TradeDate))
+        .where(Transaction.AssetID.isnot(None), Transaction.TradeDate <= as_of)
+        .group_by(Transaction.PortfolioID)
+    ).all())
+    if last_date is None:
+        # Nothing recorded yet: full backfill
+        return first_trades
+
+    snapshotted = {pid for (pid,) in db.execute(select(NavSnapshot.PortfolioID).distinct())}
+    windows = {}
+    for pid, first in first_trades.items():
+        # Portfolios with no history yet start at their first trade, everyone else at the next new day
+        windows[pid] = first if pid not in snapshotted else last_date + timedelta(days=1)
+
+    # Trades entered since the last run but dated inside already-recorded history
+    backdated = db.execute(
+        select(Transaction.PortfolioID, func.min(Transaction.TradeDate))
+        .where(Transaction.TransactionDate > last_run, Transaction.TradeDate <= last_date, Transaction.AssetID.isnot(None))
+        .group_by(Transaction.PortfolioID)
+    ).all()
+    for pid, trade_date in backdated:
+        windows[pid] = min(windows.get(pid, trade_date), trade_date)
+
+    return {pid: start for pid, start in windows.items() if start <= as_of}
+
+
+def run_snapshots(db: Session, as_of: Optional[date] = None) -> dict:
+    as_of = as_of or date.today()
+    run_at = datetime.utcnow()
+    windows = pending_windows(db, as_of)
+    if not windows:
+        return {"portfolios": 0, "rows": 0, "as_of": as_of.isoformat()}
+
+    # Portfolios sharing a start date (the usual "just today" case) are valued together
+    by_start = defaultdict(list)
+    for pid, start in windows.items():
+        by_start[start].append(pid)
+
+    rows_written = 0
+    for start, pids in sorted(by_start.items()):
+        rows = snapshot_rows(db, pids, start, as_of, run_at)
+        db.execute(delete(NavSnapshot).where(NavSnapshot.PortfolioID.in_(pids), NavSnapshot.SnapshotDate >= start))
+        if rows:
+            db.execute(insert(NavSnapshot), rows)
+        rows_written += len(rows)
+    db.commit()
+
+    return {"portfolios": len(windows), "rows": rows_written, "as_of": as_of.isoformat()}
+
+
+def snapshot_rows(db: Session, portfolio_ids: List[int], start: date, as_of: date, run_at: datetime) -> List[dict]:
+    history = build_history(db, portfolio_ids, end=as_of, start=start)
+    if history is None:
+        return []
+    keep = history.dates >= np.datetime64(start, "D")
+    dates = history.dates[keep]
+
+    # Asset-class breakdown: sum pair rows into one row per (portfolio, class)
+    asset_types = dict(db.execute(select(Asset.AssetID, Asset.AssetType).where(Asset.AssetID.in_(np.unique(history.pair_asset).tolist()))).all())
+    p_rows = np.searchsorted(history.portfolio_ids, history.pair_portfolio)
+    classes = {}
+    for column in list(ASSET_CLASS_COLUMNS.values()) + ["OtherValue"]:
+        classes[column] = np.zeros((len(history.portfolio_ids), len(dates)))
+    class_of_pair = [ASSET_CLASS_COLUMNS.get(asset_types.get(a), "OtherValue") for a in history.pair_asset.tolist()]
+    for column in classes:
+        mask = np.array([c == column for c in class_of_pair])
+        if mask.any():
+            np.add.at(classes[column], p_rows[mask], history.pair_values[mask][:, keep])
+
+    values = history.values[:, keep]
+    flows = history.flows[:, keep]
+    day_list = dates.astype(object).tolist()
+    rows = []
+    for i, pid in enumerate(history.portfolio_ids.tolist()):
+        for j, day in enumerate(day_list):
+            rows.append({
+                "PortfolioID": pid,
+                "SnapshotDate": day,
+                "NAV": float(values[i, j]),
+                "EquityValue": float(classes["EquityValue"][i, j]),
+                "DebtValue": float(classes["DebtValue"][i, j]),
+                "MutualFundValue": float(classes["MutualFundValue"][i, j]),
+                "OtherValue": float(classes["OtherValue"][i, j]),
+                "NetFlow": float(flows[i, j]),
+                "ComputedAt": run_at,
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    # Daily job: python -m backend.snapshots [YYYY-MM-DD]
+    from backend.models import SessionLocal
+    as_of = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    db = SessionLocal()
+    try:
+        print(run_snapshots(db, as_of))
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+
+from backend.main import app
+from backend.models import Asset, Holding, Portfolio, async_database_url
+
+
+def seed(db):
+    db.add_all([
+        Portfolio(PortfolioID=2, PortfolioName="Two"),
+        Asset(AssetID=1, AssetName="Nabil Bank", TickerSymbol="NABIL", AssetType="Equity", CurrentPrice=1000),
+        Asset(AssetID=2, AssetName="Govt Bond 2085", TickerSymbol="GB85", AssetType="Debt", CurrentPrice=1000),
+        Holding(PortfolioID=2, AssetID=1, Quantity=80, PurchasePrice=900),
+        Holding(PortfolioID=2, AssetID=2, Quantity=20, PurchasePrice=1000),
+    ])
+    db.commit()
+
+
+def test_async_database_url():
+    assert async_database_url("sqlite:////tmp/pms.db") == "sqlite+aiosqlite:////tmp/pms.db"
+    assert async_database_url("postgresql://u:p@host/pms?sslmode=require") == "postgresql+asyncpg://u:p@host/pms?ssl=require"
+    assert async_database_url("postgresql+psycopg2://u:p@host/pms") == "postgresql+asyncpg://u:p@host/pms"
+
+
+def test_async_portfolio_and_rebalance(client, db):
+    seed(db)
+    res = client.get("/portfolio/2")
+    assert res.status_code == 200
+    assert res.json()["EquityPercent"] == 80
+
+    proposals = client.post("/rebalance/2").json()
+    assert [p["Action"] for p in proposals] == ["Sell Equity", "Buy Debt"]
+    assert proposals[0]["Amount"] == 30000
+
+    assert client.get("/portfolio/99").status_code == 404
+
+
+def test_concurrent_async_reads(client, db):
+    seed(db)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.get("/api/portfolios") for _ in range(32)))
+
+    responses = asyncio.run(burst())
+    assert all(r.status_code == 200 and r.json()[0]["PortfolioID"] == 2 for r in responses)
+
+
+def test_uploads_run_off_the_event_loop(client, db):
+    seed(db)
+    content = b"TradeID,Amount\nT1,100\nT2,200\n"
+    res = client.post("/reconcile", files={
+        "im_file": ("im.csv", content, "text/csv"),
+        "cust_file": ("cust.csv", content, "text/csv"),
+        "ch_file": ("ch.csv", b"TradeID,Amount\nT1,100\n", "text/csv"),
+    })
+    assert res.json()["Matched"] == 1 and res.json()["MissingOrphans"] == 1
@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from backend.bench import micro, results
+from backend.bench.synthetic import Scale, generate
+from backend.models import Holding, Transaction
+from backend.positions import rebuild_positions
+
+TINY = Scale(users=2, portfolios=4, holdings=3, transactions=15, securities=12, days=20)
+
+
+def test_generator_is_deterministic(tmp_path):
+    first = generate(create_engine(f"sqlite:///{tmp_path / 'a.db'}"), TINY)
+    second = generate(create_engine(f"sqlite:///{tmp_path / 'b.db'}"), TINY)
+    assert first == second
+    assert first["rows"]["transactions"] == 60
+    assert first["rows"]["market_data"] == 12 * 20
+
+
+def test_generated_holdings_match_ledger(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'c.db'}")
+    generate(engine, TINY)
+    with Session(engine) as session:
+        assert session.execute(select(func.count()).select_from(Holding)).scalar() > 0
+        assert rebuild_positions(session, dry_run=True)["differences"] == []
+        assert session.execute(select(func.min(Transaction.Quantity))).scalar() > 0
+
+
+def test_latency_summary_percentiles():
+    stats = results.latency_summary([i / 1000 for i in range(1, 101)])
+    assert stats["count"] == 100
+    assert stats["p50_ms"] == 50.5
+    assert stats["p99_ms"] > stats["p95_ms"] > stats["p50_ms"]
+
+
+def test_micro_run_reports_every_group(tmp_path):
+    payload = micro.run(TINY, repeat=1, upload_rows=20, workdir=str(tmp_path))
+    groups = {b["group"] for b in payload["benchmarks"].values()}
+    assert groups == set(micro.GROUPS)
+    assert payload["benchmarks"]["transactions_upload"]["rows_per_second"] > 0
+    path = results.save("micro", payload, str(tmp_path / "out.json"))
+    assert path.endswith("out.json")
@@ -0,0 +1,45 @@
+from backend import db_metrics
+from backend.db_metrics import fingerprint, track_queries
+from backend.models import Asset, Holding, Portfolio
+
+
+def seed(db, holdings):
+    db.add(Portfolio(PortfolioID=2, PortfolioName="Two"))
+    for i in range(1, holdings + 1):
+        db.add(Asset(AssetID=i, AssetName=f"Asset {i}", TickerSymbol=f"T{i}", AssetType="Equity", CurrentPrice=100))
+        db.add(Holding(PortfolioID=2, AssetID=i, Quantity=10, PurchasePrice=90))
+    db.commit()
+
+
+def test_fingerprint_ignores_literals_and_in_list_length():
+    a = fingerprint("SELECT * FROM assets WHERE AssetID IN (?, ?, ?) AND Price > 10")
+    b = fingerprint("SELECT *  FROM assets\n WHERE AssetID IN (?) AND Price > 25.5")
+    assert a == b == "SELECT * FROM assets WHERE AssetID IN (?) AND Price > ?"
+    assert fingerprint("SELECT 1 FROM users WHERE UserID = 'x'") == "SELECT ? FROM users WHERE UserID = ?"
+
+
+def test_track_queries_counts_statements(db):
+    seed(db, 3)
+    with track_queries() as stats:
+        for h in db.query(Holding).all():
+            h.asset.TickerSymbol
+    # One for the holdings, one lazy load per asset
+    assert stats.count == 4
+    assert stats.most_repeated()[1] == 3
+
+
+def test_portfolio_query_count_does_not_grow_with_holdings(client, db):
+    seed(db, 25)
+    res = client.get("/portfolio/2")
+    assert res.status_code == 200
+    assert len(res.json()["Holdings"]) == 25
+    assert 1 <= int(res.headers["X-DB-Query-Count"]) <= 3
+    assert int(res.headers["X-DB-Max-Repeat"]) == 1
+    assert float(res.headers["X-DB-Time-ms"]) >= 0
+
+
+def test_repeated_statements_are_flagged(client, db, monkeypatch, capsys):
+    seed(db, 3)
+    monkeypatch.setattr(db_metrics, "REPEAT_WARN", 0)
+    client.get("/portfolio/2")
+    assert "DB warning GET /portfolio/2: possible N+1" in capsys.readouterr().out
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+
+import pytest
+
+from backend.lots import LotBook, replay
+from backend.models import Asset, Portfolio, RealizedGain
+
+
+def seed(db):
+    db.add_all([
+        Portfolio(PortfolioID=1, PortfolioName="One"),
+        Asset(AssetID=1, AssetName="Nabil Bank", TickerSymbol="NABIL", AssetType="Equity", CurrentPrice=1250),
+    ])
+    db.commit()
+
+
+def trade(day, side, qty, price, fees=0):
+    return {"PortfolioID": 1, "TickerSymbol": "NABIL", "TradeDate": day, "Type": side, "Quantity": qty, "Price": price, "BrokerFees": fees}
+
+
+def ledger_row(tid, day, side, qty, price):
+    return (tid, 1, 1, day, side, qty, price, qty * price, 0.0)
+
+
+def test_lot_book_consumes_oldest_first():
+    book = LotBook(capacity=2)
+    for i, qty in enumerate((10, 20, 30)):
+        book.add(qty, 100.0 + i, date(2025, 1, 1) + timedelta(days=i))
+
+    taken, costs, _ = book.consume(25)
+    assert taken.tolist() == [10, 15]
+    assert costs.tolist() == [100.0, 101.0]
+    assert book.open_quantity == 35
+
+    taken, _, _ = book.consume(5)
+    assert taken.tolist() == [5]
+    assert book.head == 2
+    assert book.open_lots() == [(30.0, 102.0, "2025-01-03")]
+
+
+def test_fifo_and_average_cost_gains():
+    trades = [
+        ledger_row(1, date(2024, 1, 1), "Buy", 100, 100),
+        ledger_row(2, date(2025, 1, 1), "Buy", 100, 200),
+        ledger_row(3, date(2025, 3, 1), "Sell", 150, 300),
+    ]
+    _, fifo = replay(trades, "FIFO")
+    # 100 units held over a year at cost 100, 50 short-term at cost 200
+    assert fifo[0]["CostBasis"] == pytest.approx(20000)
+    assert fifo[0]["LongTermGain"] == pytest.approx(20000)
+    assert fifo[0]["ShortTermGain"] == pytest.approx(5000)
+
+    books, average = replay(trades, "AVERAGE")
+    assert average[0]["CostBasis"] == pytest.approx(150 * 150)
+    assert average[0]["Gain"] == pytest.approx(45000 - 22500)
+    assert books[(1, 1)].open_quantity == 50
+
+
+def test_oversell_has_no_cost_basis():
+    _, sales = replay([
+        ledger_row(1, date(2025, 1, 1), "Buy", 10, 100),
+        ledger_row(2, date(2025, 1, 2), "Sell", 15, 120),
+    ], "FIFO")
+    assert sales[0]["CostBasis"] == pytest.approx(1000)
+    assert sales[0]["ShortTermGain"] == pytest.approx(1800 - 1000)
+
+
+def test_replay_of_long_history_is_linear():
+    trades = [ledger_row(i, date(2020, 1, 1) + timedelta(days=i // 2), "Buy" if i % 2 == 0 else "Sell", 10 if i % 2 == 0 else 5, 100) for i in range(20000)]
+    books, sales = replay(trades, "FIFO")
+    assert len(sales) == 10000
+    assert books[(1, 1)].open_quantity == 50000
+
+
+def test_realized_gains_follow_ingestion(client, db):
+    seed(db)
+    client.post("/api/transactions/bulk", json=[
+        trade("2024-01-01", "Buy", 100, 1000, fees=100),
+        trade("2025-01-01", "Buy", 100, 1200),
+    ])
+    client.post("/api/transactions", json=trade("2025-03-01", "Sell", 150, 1300))
+    assert db.query(RealizedGain).count() == 1
+
+    res = client.get("/api/portfolio/1/realized-gains")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["LongTermGain"] == pytest.approx(130000 - 100100)
+    assert body["ShortTermGain"] == pytest.approx(50 * 100)
+    assert body["EstimatedCGT"] == pytest.approx(round(29900 * 0.05 + 5000 * 0.075, 2))
+
+    lots = client.get("/api/portfolio/1/lots").json()
+    assert lots == [{"AssetID": 1, "Quantity": 50.0, "UnitCost": 1200.0, "AcquiredDate": "2025-01-01"}]
+
+    res = client.post("/api/lots/replay", params={"ids": "1", "method": "average"})
+    assert res.status_code == 200
+    db.expire_all()
+    assert db.query(RealizedGain).one().Method == "AVERAGE"
+
+    assert client.post("/api/lots/replay", params={"ids": "1", "method": "LIFO"}).status_code == 400
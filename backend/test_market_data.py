@@ -0,0 +1,112 @@
+import numpy as np
+
+from backend.models import Asset, EquityMaster, MarketData
+from backend.market_data import forward_fill, price_matrix
+
+
+def seed_assets(db):
+    db.add_all([
+        Asset(AssetName="Nabil Bank", TickerSymbol="NABIL", AssetType="Equity", CurrentPrice=1250),
+        Asset(AssetName="NIC Asia Bank", TickerSymbol="NICA", AssetType="Equity", CurrentPrice=750),
+        EquityMaster(ISIN="NPE123456789", TickerNSE="NICA", SecurityName="NIC Asia Bank"),
+    ])
+    db.commit()
+    return {a.TickerSymbol: a.AssetID for a in db.query(Asset).all()}
+
+
+def test_upload_and_query_matrix(client, db):
+    ids = seed_assets(db)
+    csv_data = (
+        "Symbol,ISIN,Date,Close,Volume\n"
+        "NABIL,,2025-01-01,1200,100\n"
+        "NABIL,,2025-01-02,1210,50\n"
+        ",NPE123456789,2025-01-02,740,\n"
+        "NABIL,,2025-01-05,1220,10\n"
+        "XYZ,,2025-01-05,10,1\n"
+    )
+    res = client.post("/api/market-data/upload", files={"file": ("prices.csv", csv_data, "text/csv")})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["rows_loaded"] == 4
+    assert body["unknown_tickers"] == ["XYZ"]
+
+    res = client.get("/api/market-data/prices", params={"tickers": "NABIL,NICA"})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["dates"] == ["2025-01-01", "2025-01-02", "2025-01-05"]
+    nica = body["prices"][body["assetIds"].index(ids["NICA"])]
+    nabil = body["prices"][body["assetIds"].index(ids["NABIL"])]
+    assert nabil == [1200, 1210, 1220]
+    # No price before the first observation; carried forward afterwards
+    assert nica == [None, 740, 740]
+
+
+def test_reload_overwrites_existing_prices(client, db):
+    ids = seed_assets(db)
+    for price in (100, 105):
+        res = client.post("/api/market-data/upload", files={"file": ("p.csv", f"Ticker,Date,Price\nNABIL,2025-02-03,{price}\n", "text/csv")})
+        assert res.status_code == 200
+    rows = db.query(MarketData).filter(MarketData.AssetID == ids["NABIL"]).all()
+    assert [r.Price for r in rows] == [105]
+
+
+def test_price_matrix_date_range(db):
+    ids = seed_assets(db)
+    client_ids = [ids["NABIL"], ids["NICA"]]
+    from datetime import date, timedelta
+    start = date(2024, 1, 1)
+    db.add_all(MarketData(AssetID=a, PriceDate=start + timedelta(days=d), Price=float(d + a)) for a in client_ids for d in range(10))
+    db.commit()
+
+    dates, columns, matrix = price_matrix(db, client_ids, start + timedelta(days=2), start + timedelta(days=4))
+    assert len(dates) == 3
+    assert columns.tolist() == sorted(client_ids)
+    assert matrix.shape == (3, 2)
+    assert matrix[0, 0] == 2 + columns[0]
+
+
+def test_forward_fill_keeps_leading_gaps():
+    m = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan]])
+    filled = forward_fill(m)
+    assert np.isnan(filled[0, 0])
+    assert filled[1:, 0].tolist() == [2.0, 2.0]
+    assert filled[:, 1].tolist() == [1.0, 1.0, 1.0]
+
+
+def test_bulk_price_feed_updates_current_prices(client, db):
+    from backend.valuation import current_epoch
+    ids = seed_assets(db)
+    epoch = current_epoch()
+    feed = "Ticker,ISIN,Price\nNABIL,,1300\n,NPE123456789,780\nGHOST,,5\n"
+    res = client.post("/api/prices/bulk", params={"price_date": "2025-03-02"}, files={"file": ("eod.csv", feed, "text/csv")})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["updated"] == 2
+    assert body["unknown_tickers"] == ["GHOST"]
+    assert body["epoch"] > epoch
+
+    db.expire_all()
+    prices = {a.TickerSymbol: a.CurrentPrice for a in db.query(Asset).all()}
+    assert prices == {"NABIL": 1300, "NICA": 780}
+    history = db.query(MarketData).filter(MarketData.AssetID == ids["NABIL"]).one()
+    assert str(history.PriceDate) == "2025-03-02" and history.Price == 1300
+
+
+def test_price_drop_directory(tmp_path, engine, monkeypatch):
+    from sqlalchemy.orm import sessionmaker
+    import backend.models as models
+    from backend.market_data import ingest_price_drop
+    monkeypatch.setattr(models, "SessionLocal", sessionmaker(bind=engine))
+    db = models.SessionLocal()
+    seed_assets(db)
+
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    (drop / "eod.csv").write_text("Symbol,Close\nNICA,760\n")
+    (drop / "bad.csv").write_text("Symbol\nNICA\n")
+    results = {r["file"]: r for r in ingest_price_drop(str(drop))}
+    assert results["eod.csv"]["updated"] == 1
+    assert "error" in results["bad.csv"]
+    assert (drop / "processed" / "eod.csv").exists()
+    assert (drop / "failed" / "bad.csv").exists()
+    db.close()
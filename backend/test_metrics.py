@@ -0,0 +1,60 @@
+import pytest
+
+from backend import metrics
+from backend.metrics import Counter, Histogram, render
+from backend.models import Portfolio
+
+
+@pytest.fixture
+def scratch_registry():
+    # Metrics created by a test don't leak into later scrapes
+    before = list(metrics._registry)
+    yield
+    metrics._registry[:] = before
+
+
+def sample(text, line_start):
+    return [l for l in text.splitlines() if l.startswith(line_start)]
+
+
+def test_histogram_renders_cumulative_buckets(scratch_registry):
+    h = Histogram("test_latency_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 3.0):
+        h.labels("/x").observe(v)
+    text = render()
+    assert sample(text, 'test_latency_seconds_bucket{route="/x",le="0.1"}') == ['test_latency_seconds_bucket{route="/x",le="0.1"} 1']
+    assert sample(text, 'test_latency_seconds_bucket{route="/x",le="1"}')[0].endswith(" 3")
+    assert sample(text, 'test_latency_seconds_bucket{route="/x",le="+Inf"}')[0].endswith(" 4")
+    assert sample(text, 'test_latency_seconds_count{route="/x"}')[0].endswith(" 4")
+    assert sample(text, 'test_latency_seconds_sum{route="/x"}')[0].endswith(" 4.05")
+
+
+def test_counter_escapes_labels(scratch_registry):
+    c = Counter("test_events_total", "Test events.", ("name",))
+    c.labels('a"b').inc(2)
+    assert 'test_events_total{name="a\\"b"} 2' in render()
+
+
+def test_requests_recorded_under_route_template(client, db):
+    client.get("/api/portfolio/123/nav")
+    client.get("/api/portfolio/456/nav")
+    client.get("/no/such/path")
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = res.text
+    line = sample(text, 'http_requests_total{method="GET",route="/api/portfolio/{portfolio_id}/nav",status="200"}')
+    assert line and int(float(line[0].split()[-1])) >= 2
+    assert sample(text, 'http_requests_total{method="GET",route="unmatched",status="404"}')
+    assert sample(text, 'http_request_duration_seconds_count{method="GET",route="/api/portfolio/{portfolio_id}/nav"}')
+    assert "/api/portfolio/123/nav" not in text
+    assert sample(text, "http_requests_in_flight ")
+
+
+def test_upload_throughput_recorded(client, db):
+    db.add(Portfolio(PortfolioID=1, PortfolioName="One"))
+    db.commit()
+    client.post("/api/transactions", json={"PortfolioID": 1, "TradeDate": "2025-01-01", "Type": "Buy", "Quantity": 1, "Price": 10})
+    text = client.get("/metrics").text
+    assert sample(text, 'upload_rows_total{kind="transactions"}')
+    assert sample(text, 'upload_rows_per_second_count{kind="transactions"}')
@@ -0,0 +1,73 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from backend.models import Asset, MarketData, Portfolio, Transaction
+from backend.performance import compute_performance, xirr
+
+
+def seed_history(db):
+    asset = Asset(AssetName="Nabil Bank", TickerSymbol="NABIL", AssetType="Equity", CurrentPrice=108)
+    db.add_all([asset, Portfolio(PortfolioID=1, PortfolioName="One"), Portfolio(PortfolioID=2, PortfolioName="Two")])
+    db.commit()
+    for d, p in [(date(2025, 1, 1), 100), (date(2025, 7, 1), 120), (date(2026, 1, 1), 108)]:
+        db.add(MarketData(AssetID=asset.AssetID, PriceDate=d, Price=p))
+    db.add_all([
+        # Portfolio 1: single buy and hold
+        Transaction(PortfolioID=1, AssetID=asset.AssetID, TradeDate=date(2025, 1, 1), Type="Buy", Quantity=10, Price=100),
+        # Portfolio 2: adds to the position after the rally
+        Transaction(PortfolioID=2, AssetID=asset.AssetID, TradeDate=date(2025, 1, 1), Type="Buy", Quantity=10, Price=100),
+        Transaction(PortfolioID=2, AssetID=asset.AssetID, TradeDate=date(2025, 7, 1), Type="Buy", Quantity=10, Price=120),
+    ])
+    db.commit()
+
+
+def test_twr_and_xirr(db):
+    seed_history(db)
+    results = compute_performance(db, [1, 2], date(2026, 1, 1))
+
+    one = results[1]
+    assert one["MarketValue"] == 1080
+    assert one["TWR"] == pytest.approx(0.08)
+    assert one["XIRR"] == pytest.approx(0.08)
+    # Jan 1 return is measured against the last close of the prior year
+    assert one["YTD"] == pytest.approx(108 / 120 - 1)
+
+    two = results[2]
+    # Time-weighted ignores the timing of the second purchase; money-weighted does not
+    assert two["TWR"] == pytest.approx(1.2 * 108 / 120 - 1)
+    assert two["NetContributions"] == 2200
+    t = (np.datetime64("2025-07-01") - np.datetime64("2025-01-01")).astype(float) / 365
+    npv = -1000 - 1200 / (1 + two["XIRR"]) ** t + 2160 / (1 + two["XIRR"])
+    assert npv == pytest.approx(0, abs=1e-3)
+    assert two["XIRR"] < two["TWR"]
+
+
+def test_period_returns(db):
+    seed_history(db)
+    results = compute_performance(db, [1], date(2025, 7, 1))
+    assert results[1]["SinceInception"] == pytest.approx(0.2)
+    assert results[1]["QTD"] == pytest.approx(0.2)
+    assert results[1]["MTD"] == pytest.approx(0.2)
+
+
+def test_vectorized_xirr_matches_known_rates():
+    years = np.array([0.0, 1.0, 2.0])
+    flows = np.array([
+        [-100.0, 0.0, 121.0],
+        [-100.0, 10.0, 110.0],
+        [-100.0, 0.0, 0.0],
+    ])
+    rates = xirr(flows, years)
+    assert rates[0] == pytest.approx(0.1)
+    assert rates[1] == pytest.approx(0.1)
+    assert np.isnan(rates[2])
+
+
+def test_performance_endpoint(client, db):
+    seed_history(db)
+    res = client.get("/api/performance", params={"ids": "1,2", "as_of": "2026-01-01"})
+    assert res.status_code == 200
+    assert [r["PortfolioID"] for r in res.json()] == [1, 2]
+    assert client.get("/api/portfolio/99/performance").status_code == 404
@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+from backend.models import Asset, Holding, Portfolio, Transaction
+from backend.positions import rebuild_positions
+
+
+def seed(db):
+    db.add_all([
+        Portfolio(PortfolioID=1, PortfolioName="One"),
+        Portfolio(PortfolioID=2, PortfolioName="Two"),
+        Asset(AssetID=1, AssetName="Nabil Bank", TickerSymbol="NABIL", AssetType="Equity", CurrentPrice=1250),
+        Asset(AssetID=2, AssetName="NIC Asia Bank", TickerSymbol="NICA", AssetType="Equity", CurrentPrice=750),
+    ])
+    db.commit()
+
+
+def trade(pid, ticker, day, side, qty, price, fees=0):
+    return {"PortfolioID": pid, "TickerSymbol": ticker, "TradeDate": day, "Type": side, "Quantity": qty, "Price": price, "BrokerFees": fees}
+
+
+def holdings(db):
+    return {(h.PortfolioID, h.AssetID): h for h in db.query(Holding).all()}
+
+
+def test_batches_update_only_touched_positions(client, db):
+    seed(db)
+    res = client.post("/api/transactions/bulk", json=[
+        trade(1, "NABIL", "2025-01-01", "Buy", 100, 1000, fees=100),
+        trade(1, "NICA", "2025-01-01", "Buy", 10, 700),
+        trade(2, "NABIL", "2025-01-02", "Buy", 5, 1100),
+    ])
+    assert res.status_code == 200
+    h = holdings(db)
+    assert h[(1, 1)].Quantity == 100
+    assert h[(1, 1)].PurchasePrice == pytest.approx(1001)
+
+    # Partial sell keeps the average cost, a second buy re-averages
+    client.post("/api/transactions/bulk", json=[
+        trade(1, "NABIL", "2025-01-03", "Sell", 40, 1200),
+        trade(1, "NABIL", "2025-01-04", "Buy", 60, 1101),
+    ])
+    db.expire_all()
+    h = holdings(db)
+    assert h[(1, 1)].Quantity == 120
+    assert h[(1, 1)].PurchasePrice == pytest.approx((60 * 1001 + 60 * 1101) / 120)
+    assert h[(1, 2)].Quantity == 10
+    assert h[(2, 1)].Quantity == 5
+
+    # Closing a position removes the holding
+    client.post("/api/transactions", json=trade(1, "NICA", "2025-01-05", "Sell", 10, 720))
+    db.expire_all()
+    assert (1, 2) not in holdings(db)
+
+
+def test_rebuild_matches_incremental_and_repairs_drift(client, db):
+    seed(db)
+    client.post("/api/transactions/bulk", json=[
+        trade(1, "NABIL", "2025-01-01", "Buy", 100, 1000),
+        trade(1, "NABIL", "2025-01-03", "Sell", 30, 1100),
+        trade(1, "NICA", "2025-01-02", "Buy", 10, 700),
+    ])
+    assert rebuild_positions(db, dry_run=True)["differences"] == []
+
+    # Someone edits a holding directly and adds a stray row
+    db.query(Holding).filter(Holding.AssetID == 2).update({"Quantity": 99})
+    db.add(Holding(PortfolioID=1, AssetID=1, Quantity=5, PurchasePrice=1))
+    db.commit()
+
+    report = client.post("/api/positions/rebuild", params={"dry_run": "true"}).json()
+    assert {(d["AssetID"], d["Stored"], d["Rebuilt"]) for d in report["differences"]} == {(1, 75, 70), (2, 99, 10)}
+
+    client.post("/api/positions/rebuild")
+    db.expire_all()
+    assert db.query(Holding).count() == 2
+    h = holdings(db)
+    assert h[(1, 1)].Quantity == 70 and h[(1, 1)].PurchasePrice == pytest.approx(1000)
+    assert h[(1, 2)].Quantity == 10
+    assert h[(1, 1)].PurchaseDate.date() == date(2025, 1, 1)
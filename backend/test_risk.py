@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import backend.risk as risk
+from backend.models import Asset, Holding, MarketData, Portfolio
+
+
+@pytest.fixture(autouse=True)
+def risk_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(risk, "RISK_CACHE_DIR", str(tmp_path / "risk"))
+    risk.clear_risk_cache()
+    yield
+    risk.clear_risk_cache()
+
+
+def seed_book(db):
+    rng = np.random.default_rng(7)
+    assets = [Asset(AssetName=f"Stock {i}", TickerSymbol=f"S{i}", AssetType="Equity", CurrentPrice=100) for i in range(3)]
+    db.add_all(assets + [Portfolio(PortfolioID=1, PortfolioName="Concentrated"), Portfolio(PortfolioID=2, PortfolioName="Spread")])
+    db.commit()
+    start = date(2025, 1, 1)
+    prices = 100 * np.cumprod(1 + rng.normal(0, [0.01, 0.02, 0.03], size=(120, 3)), axis=0)
+    for d in range(120):
+        for i, a in enumerate(assets):
+            db.add(MarketData(AssetID=a.AssetID, PriceDate=start + timedelta(days=d), Price=float(prices[d, i])))
+    db.add_all([
+        Holding(PortfolioID=1, AssetID=assets[2].AssetID, Quantity=100, PurchasePrice=90),
+        Holding(PortfolioID=2, AssetID=assets[0].AssetID, Quantity=50, PurchasePrice=90),
+        Holding(PortfolioID=2, AssetID=assets[1].AssetID, Quantity=50, PurchasePrice=90),
+    ])
+    db.commit()
+    return assets, prices
+
+
+def test_firm_wide_risk(db):
+    assets, prices = seed_book(db)
+    results = risk.compute_risk(db, confidence=0.99)
+    assert sorted(results) == [1, 2]
+
+    returns = prices[1:] / prices[:-1] - 1
+    one = results[1]
+    assert one["DailyVolatility"] == pytest.approx(returns[:, 2].std(ddof=1))
+    assert one["ParametricVaR"] == pytest.approx(2.326348 * one["DailyVolatility"] * 10000, rel=1e-4)
+    assert one["HistoricalVaR"] > 0
+
+    two = results[2]
+    # Component contributions add back up to total volatility
+    assert sum(c["Contribution"] for c in two["RiskContributions"]) == pytest.approx(two["DailyVolatility"])
+    assert two["DailyVolatility"] < one["DailyVolatility"]
+
+
+def test_covariance_cached_on_disk(db):
+    seed_book(db)
+    as_of = date(2025, 4, 30)
+    model = risk.get_risk_model(db, as_of)
+    assert risk.get_risk_model(db, as_of) is model
+
+    risk._models.clear()
+    cached = risk.get_risk_model(db, as_of)
+    assert isinstance(cached.cov, np.memmap)
+    assert np.allclose(cached.cov, model.cov)
+
+
+def test_risk_endpoint(client, db):
+    seed_book(db)
+    res = client.get("/api/portfolio/2/risk")
+    assert res.status_code == 200
+    assert len(res.json()["RiskContributions"]) == 2
+    assert client.get("/api/portfolio/5/risk").status_code == 404
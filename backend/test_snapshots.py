@@ -0,0 +1,75 @@
+from datetime import date, datetime, timedelta
+
+from backend.models import Asset, MarketData, NavSnapshot, Portfolio, Transaction
+from backend.snapshots import run_snapshots
+
+
+def seed(db):
+    eq = Asset(AssetName="Nabil Bank", TickerSymbol="NABIL", AssetType="Equity", CurrentPrice=100)
+    bond = Asset(AssetName="Govt Bond 2085", TickerSymbol="GB85", AssetType="Debt", CurrentPrice=1000)
+    db.add_all([eq, bond, Portfolio(PortfolioID=1, PortfolioName="One"), Portfolio(PortfolioID=2, PortfolioName="Two")])
+    db.commit()
+    for d in range(5):
+        day = date(2025, 1, 1) + timedelta(days=d)
+        db.add(MarketData(AssetID=eq.AssetID, PriceDate=day, Price=100 + d))
+        db.add(MarketData(AssetID=bond.AssetID, PriceDate=day, Price=1000))
+    db.add_all([
+        Transaction(PortfolioID=1, AssetID=eq.AssetID, TradeDate=date(2025, 1, 1), Type="Buy", Quantity=10, Price=100),
+        Transaction(PortfolioID=1, AssetID=bond.AssetID, TradeDate=date(2025, 1, 2), Type="Buy", Quantity=1, Price=1000),
+        Transaction(PortfolioID=2, AssetID=eq.AssetID, TradeDate=date(2025, 1, 3), Type="Buy", Quantity=5, Price=102),
+    ])
+    db.commit()
+    return eq, bond
+
+
+def nav(db, pid):
+    return {s.SnapshotDate: s for s in db.query(NavSnapshot).filter(NavSnapshot.PortfolioID == pid).all()}
+
+
+def test_backfill_then_incremental(db):
+    eq, bond = seed(db)
+    result = run_snapshots(db, date(2025, 1, 3))
+    assert result["portfolios"] == 2
+
+    one = nav(db, 1)
+    assert sorted(one) == [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+    assert one[date(2025, 1, 3)].NAV == 10 * 102 + 1000
+    assert one[date(2025, 1, 3)].EquityValue == 1020
+    assert one[date(2025, 1, 3)].DebtValue == 1000
+    assert one[date(2025, 1, 2)].NetFlow == 1000
+
+    # Next day only adds the new date
+    first_computed = one[date(2025, 1, 1)].ComputedAt
+    result = run_snapshots(db, date(2025, 1, 4))
+    assert result["rows"] == 2
+    db.expire_all()
+    one = nav(db, 1)
+    assert one[date(2025, 1, 4)].NAV == 10 * 103 + 1000
+    assert one[date(2025, 1, 1)].ComputedAt == first_computed
+
+
+def test_backdated_trade_recomputes_only_that_portfolio(db):
+    eq, bond = seed(db)
+    run_snapshots(db, date(2025, 1, 4))
+    untouched = nav(db, 2)[date(2025, 1, 3)].ComputedAt
+
+    db.add(Transaction(PortfolioID=1, AssetID=eq.AssetID, TradeDate=date(2025, 1, 2), Type="Sell", Quantity=5, Price=101,
+                       TransactionDate=datetime.utcnow() + timedelta(seconds=1)))
+    db.commit()
+    result = run_snapshots(db, date(2025, 1, 5))
+    assert result["portfolios"] == 2
+
+    db.expire_all()
+    one = nav(db, 1)
+    assert one[date(2025, 1, 1)].NAV == 1000
+    assert one[date(2025, 1, 3)].NAV == 5 * 102 + 1000
+    assert nav(db, 2)[date(2025, 1, 3)].ComputedAt == untouched
+
+
+def test_nav_endpoint(client, db):
+    seed(db)
+    client.post("/api/snapshots/run", params={"as_of": "2025-01-05"})
+    res = client.get("/api/portfolio/2/nav", params={"start": "2025-01-04"})
+    assert res.status_code == 200
+    assert [r["Date"] for r in res.json()] == ["2025-01-04", "2025-01-05"]
+    assert res.json()[-1]["NAV"] == 5 * 104
@@ -0,0 +1,91 @@
+import time
+from datetime import date
+
+import pandas as pd
+
+from backend.models import Asset, EquityMaster, Portfolio, Transaction
+from backend.transactions import insert_transactions, prepare_transactions
+
+
+def seed(db):
+    db.add_all([
+        Portfolio(PortfolioID=1, PortfolioName="One"),
+        Portfolio(PortfolioID=2, PortfolioName="Two"),
+        Asset(AssetName="Nabil Bank", TickerSymbol="NABIL", AssetType="Equity", CurrentPrice=1250),
+        EquityMaster(ISIN="NPE001A00001", TickerNSE="NABIL", SecurityName="Nabil Bank"),
+    ])
+    db.commit()
+
+
+def test_upload_template_columns(client, db):
+    seed(db)
+    csv_data = (
+        "Transaction ID,Trade Date,Settlement Date,Security Name,ISIN,Transaction Type,Exchange,Quantity,Price,Amount,Currency,Broker,Broker Fees\n"
+        "TXN-1,2025-11-18,,Nabil Bank,npe001a00001,BUY,NEPSE,50,1200,,NPR,Broker X,25\n"
+        "TXN-2,2025-11-20,2025-11-25,Unknown Co,NPE999,Sell,NEPSE,10,100,1000,NPR,Broker X,\n"
+    )
+    res = client.post("/api/transactions/upload", params={"portfolio_id": 1}, files={"file": ("t.csv", csv_data, "text/csv")})
+    assert res.status_code == 200, res.text
+    assert res.json()["inserted"] == 2
+    assert res.json()["unknown_securities"] == ["NPE999"]
+
+    rows = {t.TransID: t for t in db.query(Transaction).all()}
+    buy = rows["TXN-1"]
+    assert buy.Amount == 60000
+    assert buy.Type == "Buy"
+    assert buy.AssetID is not None
+    # Tuesday trade settles Thursday (T+2 on a Sunday-Thursday week)
+    assert buy.SettlementDate == date(2025, 11, 20)
+    assert rows["TXN-2"].SettlementDate == date(2025, 11, 25)
+    assert rows["TXN-2"].AssetID is None
+
+
+def test_settlement_skips_friday_saturday(client, db):
+    seed(db)
+    res = client.post("/api/transactions", json={"PortfolioID": 2, "TradeDate": "2025-11-20", "Type": "Buy", "Quantity": 5, "Price": 10})
+    assert res.status_code == 200
+    # Thursday + 2 trading days -> Monday
+    assert db.query(Transaction).one().SettlementDate == date(2025, 11, 24)
+
+
+def test_bulk_validation_rejects_whole_batch(client, db):
+    seed(db)
+    payload = [
+        {"PortfolioID": 1, "TradeDate": "2025-11-18", "Type": "Buy", "Quantity": 5, "Price": 10},
+        {"PortfolioID": 9, "TradeDate": "not a date", "Type": "Hold", "Quantity": 5, "Price": -1},
+    ]
+    res = client.post("/api/transactions/bulk", json=payload)
+    assert res.status_code == 400
+    detail = res.json()["detail"]
+    assert "Row 3" in detail and "Unknown PortfolioID" in detail and "Price must be positive" in detail
+    assert db.query(Transaction).count() == 0
+
+
+def test_list_by_portfolio_and_range(client, db):
+    seed(db)
+    payload = [{"PortfolioID": p, "TradeDate": f"2025-11-{d:02d}", "Type": "Buy", "Quantity": 1, "Price": 1} for p in (1, 2) for d in range(1, 11)]
+    assert client.post("/api/transactions/bulk", json=payload).status_code == 200
+    res = client.get("/api/transactions", params={"portfolio_id": 2, "start": "2025-11-03", "end": "2025-11-05"})
+    assert [(t["PortfolioID"], t["TradeDate"]) for t in res.json()] == [(2, "2025-11-03"), (2, "2025-11-04"), (2, "2025-11-05")]
+
+
+def test_bulk_ingestion_throughput(db):
+    seed(db)
+    n = 20000
+    df = pd.DataFrame({
+        "PortfolioID": [1 + i % 2 for i in range(n)],
+        "TradeDate": ["2025-11-18"] * n,
+        "Type": ["Buy", "Sell"] * (n // 2),
+        "Quantity": [10] * n,
+        "Price": [100.0] * n,
+        "ISIN": ["NPE001A00001"] * n,
+    })
+    start = time.perf_counter()
+    frame, errors, _ = prepare_transactions(db, df)
+    insert_transactions(db, frame)
+    db.commit()
+    elapsed = time.perf_counter() - start
+    assert not errors
+    assert db.query(Transaction).count() == n
+    # Generous bound; this is a smoke check for accidental per-row queries, not a benchmark
+    assert elapsed < 10
@@ -0,0 +1,176 @@
+import io
+import uuid
+from datetime import date, datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from backend.market_data import map_asset_ids
+from backend.models import Portfolio, Transaction
+
+# Upload template headers (Transactions page) -> model fields
+TRANSACTION_COLUMNS = {
+    "Portfolio ID": "PortfolioID",
+    "Transaction ID": "TransID",
+    "Trade Date": "TradeDate",
+    "Settlement Date": "SettlementDate",
+    "Security Name": "SecurityName",
+    "ISIN": "ISIN",
+    "Ticker": "TickerSymbol",
+    "Transaction Type": "Type",
+    "Exchange": "Exchange",
+    "Quantity": "Quantity",
+    "Price": "Price",
+    "Amount": "Amount",
+    "Currency": "Currency",
+    "Broker": "Broker",
+    "Broker Fees": "BrokerFees",
+}
+
+# NEPSE settles T+2 on Sunday-Thursday trading days
+SETTLEMENT_DAYS = 2
+SETTLEMENT_WEEKMASK = "1111001"
+
+# Rows per INSERT batch (rendered as multi-row VALUES on Postgres)
+INSERT_BATCH = 5000
+
+# Validation errors reported back before giving up listing them
+MAX_REPORTED_ERRORS = 50
+
+
+def read_transaction_file(contents: bytes, filename: str) -> pd.DataFrame:
+    if filename.endswith(".csv"):
+        return pd.read_csv(io.BytesIO(contents))
+    return pd.read_excel(io.BytesIO(contents))
+
+
+def normalize_transaction_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip() for c in df.columns]
+    return df.rename(columns={label: field for label, field in TRANSACTION_COLUMNS.items() if label in df.columns})
+
+
+def settlement_dates(trade_dates: pd.Series) -> pd.Series:
+    days = trade_dates.values.astype("datetime64[D]")
+    settled = np.busday_offset(days, SETTLEMENT_DAYS, roll="forward", weekmask=SETTLEMENT_WEEKMASK)
+    return pd.Series(settled, index=trade_dates.index)
+
+
+def prepare_transactions(db: Session, df: pd.DataFrame, portfolio_id: Optional[int] = None):
+    """Validate and derive fields for a batch of trades, column-wise.
+
+    Returns (frame ready for insert, list of row errors, unknown securities).
+    """
+    df = normalize_transaction_columns(df).reset_index(drop=True)
+    if portfolio_id is not None:
+        df["PortfolioID"] = portfolio_id
+    errors = pd.Series("", index=df.index)
+
+    def flag(mask, message):
+        nonlocal errors
+        errors = errors.where(~mask, errors + message + "; ")
+
+    for column in ("PortfolioID", "TradeDate", "Type", "Quantity", "Price"):
+        if column not in df.columns:
+            return None, [f"Missing column: {column}"], []
+
+    portfolio_ids = pd.to_numeric(df["PortfolioID"], errors="coerce")
+    flag(portfolio_ids.isna(), "PortfolioID is required")
+    known = {pid for (pid,) in db.execute(select(Portfolio.PortfolioID).where(Portfolio.PortfolioID.in_(portfolio_ids.dropna().astype(int).unique().tolist())))}
+    flag(portfolio_ids.notna() & ~portfolio_ids.isin(known), "Unknown PortfolioID")
+
+    trade_dates = pd.to_datetime(df["TradeDate"], errors="coerce")
+    flag(trade_dates.isna(), "Invalid Trade Date")
+
+    types = df["Type"].fillna("").astype(str).str.strip().str.lower()
+    types = types.map({"buy": "Buy", "b": "Buy", "sell": "Sell", "s": "Sell"})
+    flag(types.isna(), "Transaction Type must be Buy or Sell")
+
+    quantity = pd.to_numeric(df["Quantity"], errors="coerce")
+    flag(~(quantity > 0) | (quantity % 1 != 0), "Quantity must be a positive whole number")
+    price = pd.to_numeric(df["Price"], errors="coerce")
+    flag(~(price > 0), "Price must be positive")
+
+    fees = pd.to_numeric(df["BrokerFees"], errors="coerce").fillna(0.0) if "BrokerFees" in df.columns else pd.Series(0.0, index=df.index)
+    flag(fees < 0, "Broker Fees cannot be negative")
+
+    # Amount and settlement date are derived when the file leaves them blank
+    amount = quantity * price
+    if "Amount" in df.columns:
+        amount = pd.to_numeric(df["Amount"], errors="coerce").fillna(amount)
+
+    settle = settlement_dates(trade_dates.fillna(pd.Timestamp("1970-01-01")))
+    if "SettlementDate" in df.columns:
+        given = pd.to_datetime(df["SettlementDate"], errors="coerce")
+        settle = given.fillna(settle)
+    flag(trade_dates.notna() & (settle < trade_dates), "Settlement Date cannot be before Trade Date")
+
+    asset_ids, unknown = map_asset_ids(db, df)
+
+    bad = errors != ""
+    reported = [f"Row {i + 2}: {e.rstrip('; ')}" for i, e in errors[bad].head(MAX_REPORTED_ERRORS).items()]
+    if bad.any():
+        if bad.sum() > MAX_REPORTED_ERRORS:
+            reported.append(f"... and {int(bad.sum()) - MAX_REPORTED_ERRORS} more rows")
+        return None, reported, unknown
+
+    def text(column):
+        if column not in df.columns:
+            return pd.Series(None, index=df.index, dtype=object)
+        values = df[column].astype(object)
+        return values.where(values.notna(), None)
+
+    trans_ids = text("TransID")
+    missing_ids = trans_ids.isna()
+    if missing_ids.any():
+        trans_ids[missing_ids] = [f"TXN-{uuid.uuid4().hex[:12].upper()}" for _ in range(int(missing_ids.sum()))]
+
+    isins = text("ISIN")
+    frame = pd.DataFrame({
+        "PortfolioID": portfolio_ids.astype(int),
+        "AssetID": asset_ids.astype(object).where(asset_ids.notna(), None),
+        "TransID": trans_ids,
+        "TradeDate": trade_dates.dt.date,
+        "SettlementDate": settle.dt.date,
+        "SecurityName": text("SecurityName"),
+        "ISIN": isins.where(isins.isna(), isins.astype(str).str.upper()),
+        "Type": types,
+        "Exchange": text("Exchange"),
+        "Quantity": quantity.astype(int),
+        "Price": price.astype(float),
+        "Amount": amount.astype(float),
+        "Currency": text("Currency").fillna("INR"),
+        "Broker": text("Broker"),
+        "BrokerFees": fees.astype(float),
+        "TransactionDate": datetime.utcnow(),
+    })
+    return frame, [], unknown
+
+
+def insert_transactions(db: Session, frame: pd.DataFrame) -> int:
+    records = frame.to_dict("records")
+    for i in range(0, len(records), INSERT_BATCH):
+        # Core insert on the table: skips ORM unit-of-work bookkeeping per row
+        db.execute(insert(Transaction.__table__), records[i:i + INSERT_BATCH])
+    return len(records)
+
+
+def transactions_query(portfolio_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None,
+                       limit: int = 500, offset: int = 0):
+    # (PortfolioID, TradeDate) is the composite index; filters and order follow it
+    stmt = select(Transaction.__table__)
+    if portfolio_id is not None:
+        stmt = stmt.where(Transaction.PortfolioID == portfolio_id)
+    if start:
+        stmt = stmt.where(Transaction.TradeDate >= start)
+    if end:
+        stmt = stmt.where(Transaction.TradeDate <= end)
+    return stmt.order_by(Transaction.PortfolioID, Transaction.TradeDate, Transaction.TransactionID).limit(limit).offset(offset)
+
+
+def list_transactions(db: Session, portfolio_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None,
+                      limit: int = 500, offset: int = 0) -> List[dict]:
+    stmt = transactions_query(portfolio_id, start, end, limit, offset)
+    return [dict(row) for row in db.execute(stmt).mappings()]
@@ -0,0 +1,32 @@
+import threading
+from typing import Callable, Iterable, List, Optional
+
+# Valuation epoch: bumped whenever prices or positions change so anything derived from
+# Asset.CurrentPrice (caches, snapshots, live streams) knows its data is stale.
+_epoch = 0
+_lock = threading.Lock()
+_listeners: List[Callable[[int, str, Optional[List[int]]], None]] = []
+
+
+def current_epoch() -> int:
+    return _epoch
+
+
+def on_epoch_change(callback: Callable[[int, str, Optional[List[int]]], None]):
+    # callback(epoch, reason, portfolio_ids) - portfolio_ids is None when every portfolio is affected
+    _listeners.append(callback)
+    return callback
+
+
+def bump_epoch(reason: str, portfolio_ids: Optional[Iterable[int]] = None) -> int:
+    global _epoch
+    with _lock:
+        _epoch += 1
+        epoch = _epoch
+    ids = sorted(set(portfolio_ids)) if portfolio_ids is not None else None
+    for callback in list(_listeners):
+        try:
+            callback(epoch, reason, ids)
+        except Exception as e:
+            print(f"Valuation listener failed: {e}")
+    return epoch